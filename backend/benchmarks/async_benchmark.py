@@ -0,0 +1,245 @@
+"""Compare the sync (threaded Flask) and async (ASGI) serving modes.
+
+Starts the backend in each mode with the mock model backend (fixed
+latency, no admission limit, cache bypassed) and holds --concurrency
+keep-alive connections open against it, each sending worksheet
+generations back to back. Connections are opened over --ramp seconds and
+measured for --duration seconds after that. Reports throughput, latency
+percentiles and errors per mode and concurrency level, plus the server's
+peak thread count and resident memory (read from /proc, Linux only).
+
+With a 2s model latency the ideal throughput is concurrency / 2 req/s; the
+sync server needs one thread per in-flight generation to get there, the
+async server one coroutine.
+
+Usage (from the backend directory; needs uvicorn for the async mode):
+    python benchmarks/async_benchmark.py --concurrency 100,1000,2000 --duration 20
+    python benchmarks/async_benchmark.py --modes async --concurrency 5000 --json async.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+
+from load_test import BACKEND_DIR, percentile, free_port
+
+WORKSHEET = {
+    'subject': 'Mathematics',
+    'grade': 'Grade 4',
+    'language': 'English',
+    'topic': 'Fractions',
+    'difficulty': 'medium',
+    'studentLevel': 'average',
+    'userId': 'async_bench',
+    'bypassCache': True
+}
+
+SERVERS = {
+    'sync': lambda port: [sys.executable, '-m', 'flask', '--app', 'main', 'run', '--port', str(port), '--with-threads'],
+    'async': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                           '--log-level', 'warning', '--backlog', '4096']
+}
+
+
+def start_server(mode, args, workdir):
+    """Run the backend in the given mode in a subprocess; returns (process, port)"""
+    port = free_port()
+    env = {
+        **os.environ,
+        'SAHAYAK_STORE': 'memory',
+        'SAHAYAK_UPLOAD_DIR': os.path.join(workdir, 'uploads'),
+        'SAHAYAK_LLM_BACKEND': 'mock',
+        'SAHAYAK_MOCK_LATENCY': str(args.mock_latency),
+        # Measure the serving model, not admission control in front of the model
+        'SAHAYAK_LLM_CONCURRENCY': str(max(args.levels) * 2),
+        'SAHAYAK_LIMIT_ENABLED': '0',
+        'SAHAYAK_HEDGE_ENABLED': '0'
+    }
+    log = open(os.path.join(workdir, f'{mode}.log'), 'wb')
+    process = subprocess.Popen(SERVERS[mode](port), cwd=os.path.join(BACKEND_DIR, 'src'), env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{mode} server exited early; see {log.name}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"{mode} server did not become healthy within 30s")
+
+
+class ProcessSampler:
+    """Peak thread count and resident memory of a process, sampled from /proc"""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        path = f'/proc/{self.pid}/status'
+        while not self._stop.wait(self.interval):
+            try:
+                with open(path) as f:
+                    for line in f:
+                        if line.startswith('Threads:'):
+                            self.peak_threads = max(self.peak_threads, int(line.split()[1]))
+                        elif line.startswith('VmRSS:'):
+                            self.peak_rss_kb = max(self.peak_rss_kb, int(line.split()[1]))
+            except OSError:
+                return
+
+
+async def _request(reader, writer, body):
+    writer.write(
+        b'POST /api/generate-worksheet HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+        b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def drive(port, concurrency, args):
+    """Closed-loop clients, one keep-alive connection each; returns (latencies, statuses, elapsed)"""
+    body = json.dumps(WORKSHEET).encode()
+    latencies, statuses = [], {}
+    started = time.monotonic()
+    measure_from = started + args.ramp
+    stop_at = measure_from + args.duration
+
+    async def client(index):
+        await asyncio.sleep(args.ramp * index / concurrency)
+        connection = None
+        while time.monotonic() < stop_at:
+            begin = time.monotonic()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                status, keep_alive = await asyncio.wait_for(_request(*connection, body), args.timeout)
+                if not keep_alive:
+                    # The threaded dev server closes after every response
+                    connection[1].close()
+                    connection = None
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+                status = 0
+                if connection is not None:
+                    connection[1].close()
+                    connection = None
+                await asyncio.sleep(0.1)
+            end = time.monotonic()
+            if begin >= measure_from and end <= stop_at:
+                latencies.append(end - begin)
+                statuses[status] = statuses.get(status, 0) + 1
+        if connection is not None:
+            connection[1].close()
+
+    await asyncio.gather(*(client(index) for index in range(concurrency)))
+    return latencies, statuses, stop_at - measure_from
+
+
+def run_mode(mode, args, workdir):
+    process, port = start_server(mode, args, workdir)
+    results = []
+    try:
+        for concurrency in args.levels:
+            print(f"  {mode}: {concurrency} connections for {args.duration}s...", file=sys.stderr)
+            with ProcessSampler(process.pid) as sampler:
+                latencies, statuses, elapsed = asyncio.run(drive(port, concurrency, args))
+            ok = statuses.get(200, 0)
+            results.append({
+                'mode': mode,
+                'concurrency': concurrency,
+                'requests': len(latencies),
+                'throughput': ok / elapsed,
+                'idealThroughput': concurrency / args.mock_latency,
+                'p50Ms': percentile(latencies, 0.50) * 1000,
+                'p99Ms': percentile(latencies, 0.99) * 1000,
+                'errorRate': 1 - ok / len(latencies) if latencies else 1.0,
+                'statuses': {str(status): n for status, n in sorted(statuses.items())},
+                'peakThreads': sampler.peak_threads,
+                'peakRssMb': sampler.peak_rss_kb / 1024
+            })
+            # Let the server drop the previous level's connections
+            time.sleep(1)
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default='sync,async', help='comma-separated serving modes (sync, async)')
+    parser.add_argument('--concurrency', default='100,500,1000', help='comma-separated connection counts')
+    parser.add_argument('--duration', type=float, default=15, help='measured seconds per level')
+    parser.add_argument('--ramp', type=float, default=5, help='seconds over which connections are opened')
+    parser.add_argument('--mock-latency', type=float, default=2.0, help='mock model latency in seconds')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request client timeout')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    args.levels = sorted(int(level) for level in args.concurrency.split(','))
+
+    workdir = tempfile.mkdtemp(prefix='sahayak-async-bench-')
+    results = []
+    for mode in args.modes.split(','):
+        if mode not in SERVERS:
+            raise SystemExit(f"Unknown mode: {mode}")
+        results.extend(run_mode(mode, args, workdir))
+
+    print(f"{'mode':<7}{'conns':>7}{'req/s':>9}{'ideal':>8}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}{'threads':>9}{'RSS MB':>8}")
+    for result in results:
+        print(f"{result['mode']:<7}{result['concurrency']:>7}{result['throughput']:>9.1f}"
+              f"{result['idealThroughput']:>8.0f}{result['p50Ms']:>9.0f}{result['p99Ms']:>9.0f}"
+              f"{result['errorRate']:>8.1%}{result['peakThreads']:>9}{result['peakRssMb']:>8.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'mockLatency': args.mock_latency,
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
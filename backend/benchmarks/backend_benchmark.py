@@ -0,0 +1,120 @@
+"""Throughput of the HTTP model backend with and without connection reuse.
+
+Starts the bundled fake model server in-process and drives HTTPBackend from
+many threads, once with a keep-alive pool and once opening a new connection
+per request (pool size 0). With --hedge a third run adds request hedging,
+which pays off when --tail-ratio makes some upstream calls slow.
+
+Usage (from the backend directory):
+    python benchmarks/backend_benchmark.py --requests 5000 --threads 32 --latency 0
+    python benchmarks/backend_benchmark.py --requests 2000 --latency 0.02 --tail-ratio 0.03 --tail-latency 1 --hedge
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'src'))
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'tools'))
+
+from llm_backends import HTTPBackend
+from resilience import Hedger
+from fake_model_server import start_server
+
+PROMPT = "Create a short story for Grade 3 students about the water cycle.\n" * 4
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run(url, pool_size, args, hedge=False):
+    hedger = Hedger(max_workers=args.threads * 2) if hedge else None
+    # Headroom above the client threads, so hedges have spare capacity to use
+    backend = HTTPBackend(url, pool_size=pool_size, max_tokens=args.tokens,
+                          max_concurrency=args.threads * 2, timeout=30, hedger=hedger)
+
+    def call(_):
+        begin = time.perf_counter()
+        if args.stream:
+            for _ in backend.stream(PROMPT, mock=None):
+                pass
+        else:
+            backend.generate(PROMPT, mock=None)
+        return time.perf_counter() - begin
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            latencies = list(executor.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        stats = backend.stats()
+    finally:
+        backend.close()
+
+    result = {
+        'poolSize': pool_size,
+        'requestsPerSec': args.requests / elapsed,
+        'p50Ms': percentile(latencies, 0.50) * 1000,
+        'p99Ms': percentile(latencies, 0.99) * 1000,
+        'connectionsOpened': stats['connectionsOpened'],
+        'connectionsReused': stats['connectionsReused'],
+        'errors': stats['errors']
+    }
+    if hedger is not None:
+        result['hedging'] = stats['hedging']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.0, help='fake server seconds per generation')
+    parser.add_argument('--tail-ratio', type=float, default=0.0, help='fraction of fake server calls that are slow')
+    parser.add_argument('--tail-latency', type=float, default=1.0, help='seconds taken by slow calls')
+    parser.add_argument('--hedge', action='store_true', help='add a pooled run with request hedging')
+    parser.add_argument('--tokens', type=int, default=256)
+    parser.add_argument('--stream', action='store_true', help='use streaming generations')
+    parser.add_argument('--url', help='benchmark an already running server instead of the bundled fake')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(latency=args.latency, tail_ratio=args.tail_ratio,
+                              tail_latency=args.tail_latency)
+        url = f"http://127.0.0.1:{server.server_port}/v1/generate"
+
+    try:
+        results = {
+            'pooled': run(url, args.threads * 2, args),
+            'unpooled': run(url, 0, args)
+        }
+        if args.hedge:
+            results['hedged'] = run(url, args.threads * 2, args, hedge=True)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    for name, result in results.items():
+        print(f"[{name}] {result['requestsPerSec']:>8,.0f} req/s  p50 {result['p50Ms']:.2f}ms  "
+              f"p99 {result['p99Ms']:.2f}ms  connections opened {result['connectionsOpened']:,} "
+              f"reused {result['connectionsReused']:,}  errors {result['errors']}")
+        if 'hedging' in result:
+            hedging = result['hedging']
+            print(f"  hedges fired {hedging['hedgesFired']:,}  won {hedging['hedgesWon']:,}  "
+                  f"delay {hedging['delayMs']}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""End-to-end load test of the Sahayak API.
+
+Starts the backend locally (mock model backend with a configurable latency,
+throwaway database and upload directory) unless --url points at a running
+server, then drives a weighted mix of auth, generation, listing and stats
+calls from many closed-loop virtual users over keep-alive connections.
+Reports throughput, p50/p95/p99 latency and error rates per operation.
+
+Save a run as a baseline and compare later runs against it; the process
+exits with status 1 when a run regresses beyond --tolerance.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py --users 32 --duration 30 --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --users 32 --duration 30 --compare benchmarks/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SUBJECTS = ['Mathematics', 'Science', 'English', 'Hindi', 'EVS']
+TOPICS = ['Fractions', 'Water cycle', 'Plants', 'Addition', 'Our village', 'Seasons', 'Animals', 'Money']
+CONTENT_TYPES = ['story', 'lesson_plan', 'activity', 'explanation']
+
+# Operation -> weight in the default mix (roughly a teacher-facing day: more
+# reading than generating)
+DEFAULT_MIX = {
+    'login': 4,
+    'register': 1,
+    'generate-content': 10,
+    'generate-worksheet': 6,
+    'generate-visual-aid': 3,
+    'list-content': 25,
+    'list-worksheets': 12,
+    'get-content': 10,
+    'user-stats': 15,
+    'health': 4
+}
+
+
+class VirtualUser:
+    """One simulated teacher with its own keep-alive connection"""
+
+    def __init__(self, index, host, port, rng):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.rng = rng
+        self.user_id = f"load_user_{index}"
+        self.email = f"teacher{index}@load.test"
+        self.content_ids = []
+        self.cursor = None
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                return response.status, data
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def generation_params(self):
+        return {
+            'userId': self.user_id,
+            'subject': self.rng.choice(SUBJECTS),
+            'grade': f"Grade {self.rng.randint(1, 8)}",
+            'language': 'English',
+            'topic': self.rng.choice(TOPICS)
+        }
+
+    def run(self, operation):
+        """Perform one operation; returns the HTTP status"""
+        if operation == 'login':
+            return self.request('POST', '/api/auth/login', {'email': self.email, 'password': 'secret'})[0]
+        if operation == 'register':
+            email = f"new{self.index}_{self.rng.getrandbits(40):x}@load.test"
+            return self.request('POST', '/api/auth/register', {'email': email, 'password': 'secret',
+                                                               'displayName': 'Load Teacher'})[0]
+        if operation == 'generate-content':
+            status, data = self.request('POST', '/api/generate-content', {
+                **self.generation_params(), 'contentType': self.rng.choice(CONTENT_TYPES)})
+            if status == 200:
+                self.content_ids.append(json.loads(data)['contentId'])
+                del self.content_ids[:-50]
+            return status
+        if operation == 'generate-worksheet':
+            return self.request('POST', '/api/generate-worksheet', {
+                **self.generation_params(), 'difficulty': 'medium', 'studentLevel': 'average'})[0]
+        if operation == 'generate-visual-aid':
+            return self.request('POST', '/api/generate-visual-aid', {
+                **self.generation_params(), 'aidType': 'diagram'})[0]
+        if operation == 'list-content':
+            # Mostly first pages, sometimes the next page
+            path = f"/api/user/{self.user_id}/content?limit=20&fields=id,metadata,createdAt"
+            if self.cursor and self.rng.random() < 0.3:
+                path += f"&after={self.cursor}"
+            status, data = self.request('GET', path)
+            if status == 200:
+                self.cursor = json.loads(data).get('nextCursor')
+            return status
+        if operation == 'list-worksheets':
+            return self.request('GET', f"/api/user/{self.user_id}/worksheets?limit=20")[0]
+        if operation == 'get-content':
+            if not self.content_ids:
+                return self.run('list-content')
+            return self.request('GET', f"/api/content/{self.rng.choice(self.content_ids)}")[0]
+        if operation == 'user-stats':
+            return self.request('GET', f"/api/user/{self.user_id}/stats")[0]
+        if operation == 'health':
+            return self.request('GET', '/api/health')[0]
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+
+def summarize(latencies, statuses, elapsed):
+    errors = sum(count for status, count in statuses.items() if status >= 500 or status == 0)
+    shed = statuses.get(429, 0)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'throughput': count / elapsed,
+        'p50Ms': percentile(latencies, 0.50) * 1000,
+        'p95Ms': percentile(latencies, 0.95) * 1000,
+        'p99Ms': percentile(latencies, 0.99) * 1000,
+        'maxMs': max(latencies) * 1000 if latencies else 0.0,
+        'errorRate': errors / count if count else 0.0,
+        'shedRate': shed / count if count else 0.0,
+        'statuses': {str(status): n for status, n in sorted(statuses.items())}
+    }
+
+
+def run_load(host, port, args):
+    mix = dict(DEFAULT_MIX)
+    for override in args.mix or []:
+        name, _, weight = override.partition('=')
+        if name not in mix:
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        mix[name] = float(weight)
+    operations = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in operations]
+
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    started = time.monotonic()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    def user_loop(index):
+        rng = random.Random(args.seed * 100003 + index)
+        user = VirtualUser(index, host, port, rng)
+        try:
+            user.run('login')
+            while time.monotonic() < stop_at:
+                operation = rng.choices(operations, weights)[0]
+                begin = time.monotonic()
+                try:
+                    status = user.run(operation)
+                except (OSError, http.client.HTTPException):
+                    status = 0
+                end = time.monotonic()
+                if begin >= measure_from:
+                    with lock:
+                        latencies[operation].append(end - begin)
+                        statuses[operation][status] += 1
+                if args.think_time:
+                    time.sleep(rng.expovariate(1 / args.think_time))
+        finally:
+            user.close()
+
+    threads = [threading.Thread(target=user_loop, args=(index,), daemon=True) for index in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - measure_from
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    all_statuses = defaultdict(int)
+    for per_operation in statuses.values():
+        for status, count in per_operation.items():
+            all_statuses[status] += count
+
+    return {
+        'config': {
+            'users': args.users,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'mockLatency': args.mock_latency,
+            'thinkTime': args.think_time,
+            'mix': mix
+        },
+        'overall': summarize(all_latencies, all_statuses, elapsed),
+        'operations': {name: summarize(latencies[name], statuses[name], elapsed) for name in sorted(latencies)}
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(args, workdir):
+    """Run the Flask app in a subprocess with a throwaway store; returns (process, port)"""
+    port = free_port()
+    env = {
+        **os.environ,
+        'SAHAYAK_STORE': args.store,
+        'SAHAYAK_DB_PATH': os.path.join(workdir, 'load.db'),
+        'SAHAYAK_UPLOAD_DIR': os.path.join(workdir, 'uploads'),
+        'SAHAYAK_MOCK_LATENCY': str(args.mock_latency),
+        'SAHAYAK_LLM_BACKEND': 'mock'
+    }
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'main', 'run', '--port', str(port), '--with-threads'],
+        cwd=os.path.join(BACKEND_DIR, 'src'), env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Backend exited early; see {log.name}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit('Backend did not become healthy within 30s')
+
+
+def compare(result, baseline, tolerance):
+    """Regressions of this run against a baseline, as human-readable strings"""
+    problems = []
+    current, previous = result['overall'], baseline['overall']
+    if current['throughput'] < previous['throughput'] * (1 - tolerance):
+        problems.append(f"throughput {current['throughput']:.1f}/s < baseline {previous['throughput']:.1f}/s")
+    for name, stats in result['operations'].items():
+        before = baseline['operations'].get(name)
+        if before is None:
+            continue
+        # Ignore sub-millisecond noise on very fast operations
+        if stats['p95Ms'] > before['p95Ms'] * (1 + tolerance) and stats['p95Ms'] - before['p95Ms'] > 1:
+            problems.append(f"{name}: p95 {stats['p95Ms']:.1f}ms > baseline {before['p95Ms']:.1f}ms")
+        if stats['errorRate'] > before['errorRate'] + 0.01:
+            problems.append(f"{name}: error rate {stats['errorRate']:.2%} > baseline {before['errorRate']:.2%}")
+    return problems
+
+
+def print_report(result):
+    print(f"{'operation':<22}{'req':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}{'shed':>8}")
+    rows = list(result['operations'].items()) + [('overall', result['overall'])]
+    for name, stats in rows:
+        print(f"{name:<22}{stats['requests']:>8}{stats['throughput']:>9.1f}{stats['p50Ms']:>10.1f}"
+              f"{stats['p95Ms']:>10.1f}{stats['p99Ms']:>10.1f}{stats['errorRate']:>9.2%}{stats['shedRate']:>8.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='target an already running server instead of starting one')
+    parser.add_argument('--users', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before measuring')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between a user\'s requests')
+    parser.add_argument('--mock-latency', type=float, default=0.2, help='simulated model latency (local server)')
+    parser.add_argument('--store', choices=['sqlite', 'memory'], default='sqlite', help='store of the local server')
+    parser.add_argument('--mix', action='append', metavar='OPERATION=WEIGHT', help='override a weight of the mix')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='write the full results to this file')
+    parser.add_argument('--save-baseline', help='write the results as a baseline to this file')
+    parser.add_argument('--compare', help='compare against this baseline file and exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (default 20%%)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        if args.url:
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port or 80
+        else:
+            process, port = start_backend(args, workdir)
+            host = '127.0.0.1'
+        try:
+            result = run_load(host, port, args)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    print_report(result)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            print('\nRegressions against baseline:')
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print('\nNo regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Microbenchmarks for the code paths we optimise.
+
+Covers id generation, prompt building and fingerprinting, the mock content
+renderers, JSON serialization of records through the app's JSON provider,
+and the store listing/stats operations behind the user endpoints. Store and
+JSON benchmarks are parameterized by data size (--sizes, 1k to 1M records).
+
+Each benchmark is run in --repeat rounds of at least --min-time seconds;
+the median time per operation is reported, and --json writes every result
+in machine-readable form for comparing before/after a change.
+
+Usage (from the backend directory):
+    python benchmarks/microbench.py --sizes 1000,10000,100000 --json micro.json
+    python benchmarks/microbench.py --only store --stores sqlite --sizes 1000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+# The app is imported for its JSON provider and AIService; keep it off the real database
+_workdir = tempfile.mkdtemp(prefix='sahayak-microbench-')
+os.environ.setdefault('SAHAYAK_STORE', 'memory')
+os.environ.setdefault('SAHAYAK_UPLOAD_DIR', os.path.join(_workdir, 'uploads'))
+
+from store_benchmark import make_records, CONTENT_TYPES
+from content_store import ContentStore
+from sqlite_store import SqliteStore
+from ids import IdGenerator
+from prompts import prompt_registry
+from flask.json.provider import DefaultJSONProvider
+
+RECORDS_PER_USER = 200
+PAGE_SIZE = 20
+
+
+def measure(fn, min_time, repeat):
+    """Median seconds per call of fn over `repeat` rounds lasting at least `min_time` each"""
+    # Calibrate the number of calls per round
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 10 or calls >= 1 << 24:
+            break
+        calls *= 2
+    calls = max(1, int(calls * (min_time / max(elapsed, 1e-9))))
+
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        rounds.append((time.perf_counter() - started) / calls)
+    return {
+        'nsPerOp': statistics.median(rounds) * 1e9,
+        'minNsPerOp': min(rounds) * 1e9,
+        'opsPerSec': 1 / statistics.median(rounds),
+        'callsPerRound': calls,
+        'rounds': repeat
+    }
+
+
+# Benchmarks. Each group yields (name, size, fn) for the requested sizes.
+
+def bench_ids(sizes, args):
+    generator = IdGenerator(node_id=1)
+    yield 'ids.next_id', None, generator.next_id
+
+
+def bench_prompts(sizes, args):
+    params = {'subject': 'Mathematics', 'grade': 'Grade 4', 'language': 'Hindi',
+              'topic': 'Fractions with rotis', 'content_type': 'story'}
+    yield 'prompts.render.content', None, lambda: prompt_registry.render('content', **params)
+    yield 'prompts.fingerprint.content', None, lambda: prompt_registry.fingerprint('content', **params)
+
+    from ai_services import ai_service
+    yield 'ai.build_worksheet_prompt', None, lambda: ai_service._build_worksheet_prompt(
+        'Science', 'Grade 5', 'English', 'Water cycle', 'medium', 'average')
+
+
+def bench_renderers(sizes, args):
+    from ai_services import ai_service
+    yield 'ai.mock_content', None, lambda: ai_service._generate_mock_content(
+        'Mathematics', 'Grade 4', 'Hindi', 'Fractions', 'story')
+    yield 'ai.mock_worksheet', None, lambda: ai_service._generate_mock_worksheet(
+        'Science', 'Grade 5', 'English', 'Water cycle', 'medium', 'average')
+    yield 'ai.mock_visual_aid', None, lambda: ai_service._generate_mock_visual_aid(
+        'EVS', 'Grade 3', 'English', 'Our village', 'diagram')
+
+
+def bench_json(sizes, args):
+    import main
+    records = list(make_records(max(sizes), users=max(1, max(sizes) // RECORDS_PER_USER), start_time=time.time()))
+    listing = [{'id': r['id'], 'metadata': r['metadata'], 'createdAt': r['createdAt']} for r in records]
+    large = dict(records[0], content=records[0]['content'] * 50)
+
+    with main.app.app_context():
+        dumps = main.app.json.dumps
+        yield 'json.page_full', PAGE_SIZE, lambda: dumps({'success': True, 'content': records[:PAGE_SIZE]})
+        yield 'json.large_record', len(large['content']), lambda: dumps({'success': True, 'content': large})
+        # The standard library encoder the app provider replaces when orjson is installed
+        stdlib = DefaultJSONProvider(main.app).dumps
+        yield 'json.large_record_stdlib', len(large['content']), lambda: stdlib({'success': True, 'content': large})
+        for size in sizes:
+            page = listing[:size]
+            yield 'json.listing_fields', size, lambda page=page: dumps({'success': True, 'content': page})
+        yield 'json.jsonify_page', PAGE_SIZE, lambda: main.jsonify({'success': True, 'content': records[:PAGE_SIZE]})
+
+
+def _stores(args):
+    for kind in args.stores.split(','):
+        if kind == 'memory':
+            yield kind, lambda: ContentStore()
+        elif kind == 'sqlite':
+            yield kind, lambda: SqliteStore(os.path.join(tempfile.mkdtemp(dir=_workdir), 'bench.db'))
+        else:
+            raise SystemExit(f"Unknown store: {kind}")
+
+
+def bench_store(sizes, args):
+    for kind, build in _stores(args):
+        for size in sizes:
+            store = build()
+            users = max(1, size // RECORDS_PER_USER)
+            batch = []
+            started = time.perf_counter()
+            for record in make_records(size, users, time.time()):
+                batch.append(record)
+                if len(batch) >= 10_000:
+                    store.insert_many('content', batch)
+                    batch = []
+            if batch:
+                store.insert_many('content', batch)
+            print(f"  loaded {size:,} records into {kind} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+            rng = random.Random(args.seed)
+
+            def user():
+                return f"user_{rng.randrange(users)}"
+
+            def next_page():
+                user_id = user()
+                page = store.list_user('content', user_id, limit=PAGE_SIZE)
+                if page:
+                    store.list_user('content', user_id, limit=PAGE_SIZE, after=page[-1]['id'])
+
+            prefix = f"store.{kind}"
+            yield f"{prefix}.list_first_page", size, lambda: store.list_user('content', user(), limit=PAGE_SIZE)
+            yield f"{prefix}.list_by_type", size, lambda: store.list_user(
+                'content', user(), content_type=rng.choice(CONTENT_TYPES), limit=PAGE_SIZE)
+            yield f"{prefix}.list_two_pages", size, next_page
+            yield f"{prefix}.list_all_for_user", size, lambda: store.list_user('content', user())
+            yield f"{prefix}.count_user", size, lambda: store.count_user('content', user())
+            yield f"{prefix}.user_stats", size, lambda: store.user_stats(user())
+            record_id = store.list_user('content', user(), limit=1)[0]['id']
+            yield f"{prefix}.get", size, lambda: store.get('content', record_id)
+            yield f"{prefix}.get_json", size, lambda: store.get_json('content', record_id)
+            if hasattr(store, 'close'):
+                store.close()
+
+
+GROUPS = {
+    'ids': bench_ids,
+    'prompts': bench_prompts,
+    'renderers': bench_renderers,
+    'json': bench_json,
+    'store': bench_store
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma-separated record counts for store/json benchmarks (up to 1000000)')
+    parser.add_argument('--only', help=f"comma-separated groups to run ({', '.join(GROUPS)})")
+    parser.add_argument('--stores', default='memory,sqlite', help='stores for the store group')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per round')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds per benchmark')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    groups = args.only.split(',') if args.only else list(GROUPS)
+    random.seed(args.seed)
+
+    results = []
+    print(f"{'benchmark':<34}{'size':>10}{'ns/op':>14}{'ops/s':>14}")
+    for group in groups:
+        if group not in GROUPS:
+            raise SystemExit(f"Unknown group: {group}")
+        # Consume lazily: store benchmarks must run before their store is closed
+        for name, size, fn in GROUPS[group](sizes, args):
+            result = {'name': name, 'group': group, 'size': size, **measure(fn, args.min_time, args.repeat)}
+            results.append(result)
+            size_label = f"{size:,}" if size is not None else '-'
+            print(f"{name:<34}{size_label:>10}{result['nsPerOp']:>14,.0f}{result['opsPerSec']:>14,.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'sizes': sizes,
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
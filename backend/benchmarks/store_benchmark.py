@@ -0,0 +1,134 @@
+"""Insert and listing throughput of the record stores.
+
+Usage (from the backend directory):
+    python benchmarks/store_benchmark.py --records 1000000 --store sqlite
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from content_store import ContentStore
+from sqlite_store import SqliteStore
+from ids import IdGenerator
+
+SUBJECTS = ['Mathematics', 'Science', 'English', 'Hindi', 'Social Studies', 'EVS']
+CONTENT_TYPES = ['lesson_plan', 'story', 'explanation', 'activity']
+BODY = "# Lesson\n\n" + "Locally relevant example text for rural classrooms. " * 40
+
+
+def make_records(count, users, start_time):
+    ids = IdGenerator(node_id=1)
+    for index in range(count):
+        yield {
+            'id': ids.next_id(),
+            'userId': f"user_{random.randrange(users)}",
+            'content': BODY,
+            'metadata': {
+                'subject': random.choice(SUBJECTS),
+                'grade': f"Grade {random.randint(1, 8)}",
+                'language': 'English',
+                'topic': f"Topic {index % 500}",
+                'content_type': random.choice(CONTENT_TYPES)
+            },
+            'createdAt': start_time + index * 0.001
+        }
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def timed_ops(fn, iterations):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+    return {
+        'opsPerSec': iterations / elapsed,
+        'p50Ms': percentile(latencies, 0.50) * 1000,
+        'p99Ms': percentile(latencies, 0.99) * 1000
+    }
+
+
+def run(store, args):
+    random.seed(args.seed)
+    result = {'records': args.records, 'users': args.users}
+
+    batch = []
+    started = time.perf_counter()
+    for record in make_records(args.records, args.users, time.time()):
+        batch.append(record)
+        if len(batch) >= args.batch:
+            store.insert_many('content', batch)
+            batch = []
+    if batch:
+        store.insert_many('content', batch)
+    elapsed = time.perf_counter() - started
+    result['insert'] = {'seconds': elapsed, 'recordsPerSec': args.records / elapsed}
+
+    def random_user():
+        return f"user_{random.randrange(args.users)}"
+
+    result['firstPage'] = timed_ops(
+        lambda: store.list_user('content', random_user(), limit=args.page_size), args.iterations)
+    result['firstPageByType'] = timed_ops(
+        lambda: store.list_user('content', random_user(), content_type=random.choice(CONTENT_TYPES),
+                                limit=args.page_size), args.iterations)
+
+    def deep_page():
+        user_id = random_user()
+        page = store.list_user('content', user_id, limit=args.page_size)
+        if page:
+            store.list_user('content', user_id, limit=args.page_size, after=page[-1]['id'])
+    result['nextPage'] = timed_ops(deep_page, args.iterations)
+    result['stats'] = timed_ops(lambda: store.user_stats(random_user()), args.iterations)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=10_000, help='records per insert_many transaction')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--store', choices=['sqlite', 'memory', 'both'], default='sqlite')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    if args.store in ('memory', 'both'):
+        results['memory'] = run(ContentStore(), args)
+    if args.store in ('sqlite', 'both'):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SqliteStore(os.path.join(directory, 'bench.db'))
+            try:
+                results['sqlite'] = run(store, args)
+            finally:
+                store.close()
+
+    for name, result in results.items():
+        print(f"[{name}] {result['records']:,} records / {result['users']:,} users")
+        print(f"  insert      {result['insert']['recordsPerSec']:>12,.0f} records/s ({result['insert']['seconds']:.1f}s)")
+        for key in ('firstPage', 'firstPageByType', 'nextPage', 'stats'):
+            ops = result[key]
+            print(f"  {key:<15} {ops['opsPerSec']:>8,.0f} ops/s  p50 {ops['p50Ms']:.3f}ms  p99 {ops['p99Ms']:.3f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,58 +1,61 @@
 import os
 import json
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncGenerator, AsyncIterator, Generator, Callable, Tuple, Union
 import logging
 
-# For development, we'll use mock responses
-# In production, uncomment the Gemini imports
-# from google import genai
-# from google.genai import types
+from prompts import prompt_registry, RenderedPrompt
+from response_cache import ResponseCache, cached_generation
+from singleflight import SingleFlight
+from llm_backends import LLMBackend, build_backend
+from concurrency_limiter import OverloadedError
+from resilience import CircuitOpenError
+from tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Streaming generators yield text chunks and return the metadata when exhausted
+TextStream = Generator[str, None, Dict[str, Any]]
+# Async generators cannot return a value: they yield the text chunks, then the metadata dict last
+AsyncTextStream = AsyncGenerator[Union[str, Dict[str, Any]], None]
+
+def _build_cache() -> Optional[ResponseCache]:
+    """Build the response cache from SAHAYAK_CACHE_* environment settings"""
+    if os.environ.get('SAHAYAK_CACHE_ENABLED', '1') == '0':
+        return None
+    return ResponseCache(
+        max_entries=int(os.environ.get('SAHAYAK_CACHE_SIZE', '1024')),
+        ttl=float(os.environ.get('SAHAYAK_CACHE_TTL', '3600'))
+    )
+
 class AIService:
-    def __init__(self):
-        # For production, initialize Gemini client
-        # self.client = genai.Client()
-        # self.model = "gemini-1.5-pro"
-        pass
+    def __init__(self, cache: Optional[ResponseCache] = None,
+                 flight: Optional[SingleFlight] = None,
+                 backend: Optional[LLMBackend] = None):
+        # Mock, HTTP model server or Gemini, selected by SAHAYAK_LLM_BACKEND
+        self.backend = backend or build_backend()
+        self.cache = cache
+        # Identical concurrent generations share one upstream call
+        self.flight = flight
     
+    @cached_generation('content')
     def generate_educational_content(self, subject: str, grade: str, language: str, 
                                    topic: str, content_type: str) -> Dict[str, Any]:
         """Generate educational content using AI"""
         try:
-            # Mock response for development
-            time.sleep(2)  # Simulate API call
-            
             prompt = self._build_content_prompt(subject, grade, language, topic, content_type)
             
-            # In production, use actual Gemini API:
-            # response = self.client.models.generate_content(
-            #     model=self.model,
-            #     contents=prompt,
-            #     config=types.GenerateContentConfig(
-            #         temperature=0.7,
-            #         max_output_tokens=2048
-            #     )
-            # )
-            # content = response.text
-            
-            # Mock content for development
-            content = self._generate_mock_content(subject, grade, language, topic, content_type)
+            content, degraded = self._complete(prompt, lambda: self._generate_mock_content(subject, grade, language, topic, content_type))
             
             return {
                 'success': True,
                 'content': content,
-                'metadata': {
-                    'subject': subject,
-                    'grade': grade,
-                    'language': language,
-                    'topic': topic,
-                    'content_type': content_type,
-                    'generated_at': time.time()
-                }
+                'metadata': self._metadata(prompt, degraded, subject=subject, grade=grade, language=language,
+                                           topic=topic, content_type=content_type)
             }
+        except OverloadedError:
+            # Shed load is reported to the caller as a 429, not a failed generation
+            raise
         except Exception as e:
             logger.error(f"Error generating content: {str(e)}")
             return {
@@ -60,30 +63,23 @@ class AIService:
                 'error': str(e)
             }
     
+    @cached_generation('worksheet')
     def generate_worksheet(self, subject: str, grade: str, language: str, 
                           topic: str, difficulty: str, student_level: str) -> Dict[str, Any]:
         """Generate personalized worksheet"""
         try:
-            time.sleep(2)
-            
             prompt = self._build_worksheet_prompt(subject, grade, language, topic, difficulty, student_level)
             
-            # Mock worksheet for development
-            worksheet = self._generate_mock_worksheet(subject, grade, language, topic, difficulty, student_level)
+            worksheet, degraded = self._complete(prompt, lambda: self._generate_mock_worksheet(subject, grade, language, topic, difficulty, student_level))
             
             return {
                 'success': True,
                 'worksheet': worksheet,
-                'metadata': {
-                    'subject': subject,
-                    'grade': grade,
-                    'language': language,
-                    'topic': topic,
-                    'difficulty': difficulty,
-                    'student_level': student_level,
-                    'generated_at': time.time()
-                }
+                'metadata': self._metadata(prompt, degraded, subject=subject, grade=grade, language=language,
+                                           topic=topic, difficulty=difficulty, student_level=student_level)
             }
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error generating worksheet: {str(e)}")
             return {
@@ -91,29 +87,129 @@ class AIService:
                 'error': str(e)
             }
     
+    @cached_generation('visual_aid')
     def generate_visual_aid(self, subject: str, grade: str, language: str, 
                            topic: str, aid_type: str) -> Dict[str, Any]:
         """Generate visual aid instructions"""
         try:
-            time.sleep(2)
+            prompt = self._build_visual_aid_prompt(subject, grade, language, topic, aid_type)
+            
+            visual_aid, degraded = self._complete(prompt, lambda: self._generate_mock_visual_aid(subject, grade, language, topic, aid_type))
+            
+            return {
+                'success': True,
+                'description': visual_aid,
+                'metadata': self._metadata(prompt, degraded, subject=subject, grade=grade, language=language,
+                                           topic=topic, aid_type=aid_type)
+            }
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating visual aid: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def stream_educational_content(self, subject: str, grade: str, language: str,
+                                   topic: str, content_type: str) -> TextStream:
+        """Stream educational content chunk by chunk as the model produces it"""
+        prompt = self._build_content_prompt(subject, grade, language, topic, content_type)
+        
+        degraded = yield from self._complete_stream(prompt, lambda: self._generate_mock_content(subject, grade, language, topic, content_type))
+        
+        return self._metadata(prompt, degraded, streamed=True, subject=subject, grade=grade, language=language,
+                              topic=topic, content_type=content_type)
+    
+    def stream_worksheet(self, subject: str, grade: str, language: str,
+                         topic: str, difficulty: str, student_level: str) -> TextStream:
+        """Stream a worksheet chunk by chunk as the model produces it"""
+        prompt = self._build_worksheet_prompt(subject, grade, language, topic, difficulty, student_level)
+        
+        degraded = yield from self._complete_stream(prompt, lambda: self._generate_mock_worksheet(subject, grade, language, topic, difficulty, student_level))
+        
+        return self._metadata(prompt, degraded, streamed=True, subject=subject, grade=grade, language=language,
+                              topic=topic, difficulty=difficulty, student_level=student_level)
+    
+    def stream_visual_aid(self, subject: str, grade: str, language: str,
+                          topic: str, aid_type: str) -> TextStream:
+        """Stream visual aid instructions chunk by chunk as the model produces them"""
+        prompt = self._build_visual_aid_prompt(subject, grade, language, topic, aid_type)
+        
+        degraded = yield from self._complete_stream(prompt, lambda: self._generate_mock_visual_aid(subject, grade, language, topic, aid_type))
+        
+        return self._metadata(prompt, degraded, streamed=True, subject=subject, grade=grade, language=language,
+                              topic=topic, aid_type=aid_type)
+    
+    # Async API, used by the ASGI app (asgi.py). Same results as the methods
+    # above, but model calls are awaited on the event loop instead of holding
+    # a thread for their whole duration.
+    
+    @cached_generation('content')
+    async def agenerate_educational_content(self, subject: str, grade: str, language: str,
+                                            topic: str, content_type: str) -> Dict[str, Any]:
+        """Async counterpart of generate_educational_content"""
+        try:
+            prompt = self._build_content_prompt(subject, grade, language, topic, content_type)
+            
+            content, degraded = await self._acomplete(prompt, lambda: self._generate_mock_content(subject, grade, language, topic, content_type))
+            
+            return {
+                'success': True,
+                'content': content,
+                'metadata': self._metadata(prompt, degraded, subject=subject, grade=grade, language=language,
+                                           topic=topic, content_type=content_type)
+            }
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating content: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @cached_generation('worksheet')
+    async def agenerate_worksheet(self, subject: str, grade: str, language: str,
+                                  topic: str, difficulty: str, student_level: str) -> Dict[str, Any]:
+        """Async counterpart of generate_worksheet"""
+        try:
+            prompt = self._build_worksheet_prompt(subject, grade, language, topic, difficulty, student_level)
             
+            worksheet, degraded = await self._acomplete(prompt, lambda: self._generate_mock_worksheet(subject, grade, language, topic, difficulty, student_level))
+            
+            return {
+                'success': True,
+                'worksheet': worksheet,
+                'metadata': self._metadata(prompt, degraded, subject=subject, grade=grade, language=language,
+                                           topic=topic, difficulty=difficulty, student_level=student_level)
+            }
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating worksheet: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @cached_generation('visual_aid')
+    async def agenerate_visual_aid(self, subject: str, grade: str, language: str,
+                                   topic: str, aid_type: str) -> Dict[str, Any]:
+        """Async counterpart of generate_visual_aid"""
+        try:
             prompt = self._build_visual_aid_prompt(subject, grade, language, topic, aid_type)
             
-            # Mock visual aid for development
-            visual_aid = self._generate_mock_visual_aid(subject, grade, language, topic, aid_type)
+            visual_aid, degraded = await self._acomplete(prompt, lambda: self._generate_mock_visual_aid(subject, grade, language, topic, aid_type))
             
             return {
                 'success': True,
                 'description': visual_aid,
-                'metadata': {
-                    'subject': subject,
-                    'grade': grade,
-                    'language': language,
-                    'topic': topic,
-                    'aid_type': aid_type,
-                    'generated_at': time.time()
-                }
+                'metadata': self._metadata(prompt, degraded, subject=subject, grade=grade, language=language,
+                                           topic=topic, aid_type=aid_type)
             }
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error generating visual aid: {str(e)}")
             return {
@@ -121,14 +217,50 @@ class AIService:
                 'error': str(e)
             }
     
+    async def astream_educational_content(self, subject: str, grade: str, language: str,
+                                          topic: str, content_type: str) -> AsyncTextStream:
+        """Async counterpart of stream_educational_content"""
+        prompt = self._build_content_prompt(subject, grade, language, topic, content_type)
+        
+        async for item in self._acomplete_stream(prompt, lambda: self._generate_mock_content(subject, grade, language, topic, content_type)):
+            if isinstance(item, bool):
+                yield self._metadata(prompt, item, streamed=True, subject=subject, grade=grade, language=language,
+                                     topic=topic, content_type=content_type)
+            else:
+                yield item
+    
+    async def astream_worksheet(self, subject: str, grade: str, language: str,
+                                topic: str, difficulty: str, student_level: str) -> AsyncTextStream:
+        """Async counterpart of stream_worksheet"""
+        prompt = self._build_worksheet_prompt(subject, grade, language, topic, difficulty, student_level)
+        
+        async for item in self._acomplete_stream(prompt, lambda: self._generate_mock_worksheet(subject, grade, language, topic, difficulty, student_level)):
+            if isinstance(item, bool):
+                yield self._metadata(prompt, item, streamed=True, subject=subject, grade=grade, language=language,
+                                     topic=topic, difficulty=difficulty, student_level=student_level)
+            else:
+                yield item
+    
+    async def astream_visual_aid(self, subject: str, grade: str, language: str,
+                                 topic: str, aid_type: str) -> AsyncTextStream:
+        """Async counterpart of stream_visual_aid"""
+        prompt = self._build_visual_aid_prompt(subject, grade, language, topic, aid_type)
+        
+        async for item in self._acomplete_stream(prompt, lambda: self._generate_mock_visual_aid(subject, grade, language, topic, aid_type)):
+            if isinstance(item, bool):
+                yield self._metadata(prompt, item, streamed=True, subject=subject, grade=grade, language=language,
+                                     topic=topic, aid_type=aid_type)
+            else:
+                yield item
+    
     def analyze_voice_assessment(self, subject: str, grade: str, language: str, 
-                                question: str, audio_data: Optional[str] = None) -> Dict[str, Any]:
+                                question: str, audio: Optional[memoryview] = None) -> Dict[str, Any]:
         """Analyze voice assessment using speech-to-text and AI"""
         try:
             time.sleep(3)
             
             # In production, use Vertex AI Speech-to-Text:
-            # transcription = self._transcribe_audio(audio_data, language)
+            # transcription = self._transcribe_audio(audio, language)
             # analysis = self._analyze_response(transcription, question, subject, grade, language)
             
             # Mock analysis for development
@@ -153,21 +285,16 @@ class AIService:
             }
     
     def analyze_image(self, subject: str, grade: str, language: str, 
-                     image_data: Optional[str] = None) -> Dict[str, Any]:
+                     image: Optional[memoryview] = None) -> Dict[str, Any]:
         """Analyze image for educational content"""
         try:
-            time.sleep(2)
+            prompt = self._build_image_analysis_prompt(subject, grade, language)
             
-            # In production, use Gemini Vision:
-            # prompt = self._build_image_analysis_prompt(subject, grade, language)
-            # response = self.client.models.generate_content(
-            #     model="gemini-1.5-pro",
-            #     contents=[prompt, {"mime_type": "image/jpeg", "data": image_data}]
-            # )
-            # analysis = json.loads(response.text)
-            
-            # Mock analysis for development
-            analysis = self._generate_mock_image_analysis(subject, grade, language)
+            # Image bytes are not sent yet; the prompt asks for a JSON analysis
+            analysis, degraded = self._complete(
+                prompt, lambda: self._generate_mock_image_analysis(subject, grade, language),
+                response_format='json'
+            )
             
             return {
                 'success': True,
@@ -176,9 +303,12 @@ class AIService:
                     'subject': subject,
                     'grade': grade,
                     'language': language,
-                    'analyzed_at': time.time()
+                    'analyzed_at': time.time(),
+                    'degraded': degraded
                 }
             }
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing image: {str(e)}")
             return {
@@ -186,93 +316,88 @@ class AIService:
                 'error': str(e)
             }
     
+    @traced('model.generate')
+    def _complete(self, prompt: RenderedPrompt, fallback: Callable[[], Any],
+                  response_format: str = 'text') -> Tuple[Any, bool]:
+        """Model output for a prompt and whether it is degraded.
+
+        While the backend's circuit breaker is open the built-in template
+        output from ``fallback`` is returned instead of failing the request.
+        """
+        try:
+            return self.backend.generate(prompt.text, mock=fallback, response_format=response_format), False
+        except CircuitOpenError:
+            return fallback(), True
+    
+    @traced('model.stream')
+    def _complete_stream(self, prompt: RenderedPrompt, fallback: Callable[[], str]) -> Generator[str, None, bool]:
+        """Streaming counterpart of _complete; returns whether the output is degraded"""
+        try:
+            yield from self.backend.stream(prompt.text, mock=fallback)
+        except CircuitOpenError:
+            yield fallback()
+            return True
+        return False
+    
+    @traced('model.generate')
+    async def _acomplete(self, prompt: RenderedPrompt, fallback: Callable[[], Any],
+                         response_format: str = 'text') -> Tuple[Any, bool]:
+        """Async counterpart of _complete"""
+        try:
+            return await self.backend.agenerate(prompt.text, mock=fallback, response_format=response_format), False
+        except CircuitOpenError:
+            return fallback(), True
+    
+    @traced('model.stream')
+    async def _acomplete_stream(self, prompt: RenderedPrompt, fallback: Callable[[], str]) -> AsyncIterator[Any]:
+        """Async counterpart of _complete_stream: yields the text chunks, then whether the output is degraded"""
+        try:
+            async for chunk in self.backend.astream(prompt.text, mock=fallback):
+                yield chunk
+        except CircuitOpenError:
+            yield fallback()
+            yield True
+            return
+        yield False
+    
+    def _metadata(self, prompt: RenderedPrompt, degraded: bool, streamed: bool = False, **params) -> Dict[str, Any]:
+        """Metadata of a generation: its parameters, when and from which prompt it was made"""
+        metadata = {
+            **params,
+            'generated_at': time.time(),
+            'prompt_version': prompt.version,
+            'prompt_fingerprint': prompt.fingerprint
+        }
+        if streamed:
+            metadata['streamed'] = True
+        metadata['degraded'] = degraded
+        return metadata
+    
+    @traced('prompt.build')
     def _build_content_prompt(self, subject: str, grade: str, language: str, 
-                             topic: str, content_type: str) -> str:
+                             topic: str, content_type: str) -> RenderedPrompt:
         """Build prompt for content generation"""
-        return f"""
-        Create educational content for rural teachers in {language}.
-        
-        Subject: {subject}
-        Grade Level: {grade}
-        Topic: {topic}
-        Content Type: {content_type}
-        
-        Requirements:
-        - Use simple, clear language appropriate for {grade} students
-        - Include culturally relevant examples from rural Indian contexts
-        - Provide practical activities using locally available materials
-        - Make content engaging and interactive
-        - Include assessment methods suitable for multi-grade classrooms
-        - Ensure content is appropriate for low-resource settings
-        
-        Generate comprehensive {content_type} content that teachers can use immediately.
-        """
+        return prompt_registry.render('content', subject=subject, grade=grade, language=language,
+                                      topic=topic, content_type=content_type)
     
+    @traced('prompt.build')
     def _build_worksheet_prompt(self, subject: str, grade: str, language: str, 
-                               topic: str, difficulty: str, student_level: str) -> str:
+                               topic: str, difficulty: str, student_level: str) -> RenderedPrompt:
         """Build prompt for worksheet generation"""
-        return f"""
-        Create a worksheet for rural students in {language}.
-        
-        Subject: {subject}
-        Grade Level: {grade}
-        Topic: {topic}
-        Difficulty: {difficulty}
-        Student Level: {student_level}
-        
-        Requirements:
-        - Include multiple question types (MCQ, short answer, problem-solving)
-        - Adapt difficulty to {student_level} students
-        - Use examples relevant to rural life
-        - Provide clear instructions in {language}
-        - Include assessment rubric for teachers
-        - Make it suitable for multi-grade classrooms
-        
-        Generate a complete worksheet with answer key.
-        """
+        return prompt_registry.render('worksheet', subject=subject, grade=grade, language=language,
+                                      topic=topic, difficulty=difficulty, student_level=student_level)
     
+    @traced('prompt.build')
     def _build_visual_aid_prompt(self, subject: str, grade: str, language: str, 
-                                topic: str, aid_type: str) -> str:
+                                topic: str, aid_type: str) -> RenderedPrompt:
         """Build prompt for visual aid generation"""
-        return f"""
-        Create instructions for making a {aid_type} about {topic} in {language}.
-        
-        Subject: {subject}
-        Grade Level: {grade}
-        Visual Aid Type: {aid_type}
-        
-        Requirements:
-        - Use only low-cost, locally available materials
-        - Provide step-by-step creation instructions
-        - Include classroom usage guidelines
-        - Make it engaging for {grade} students
-        - Ensure it's suitable for rural classroom settings
-        - Include cultural context relevant to rural India
-        
-        Generate detailed instructions that any teacher can follow.
-        """
+        return prompt_registry.render('visual_aid', subject=subject, grade=grade, language=language,
+                                      topic=topic, aid_type=aid_type)
     
-    def _build_image_analysis_prompt(self, subject: str, grade: str, language: str) -> str:
+    @traced('prompt.build')
+    def _build_image_analysis_prompt(self, subject: str, grade: str, language: str) -> RenderedPrompt:
         """Build prompt for image analysis"""
-        return f"""
-        Analyze this image for educational opportunities in {language}.
-        
-        Context:
-        - Subject: {subject}
-        - Grade Level: {grade}
-        - Rural classroom setting
-        
-        Provide:
-        1. Description of what's in the image
-        2. Educational concepts that can be taught
-        3. Lesson plan ideas
-        4. Discussion questions for students
-        5. Cross-curricular connections
-        6. Assessment ideas
-        7. Cultural connections relevant to rural India
-        
-        Format response as JSON with these sections.
-        """
+        return prompt_registry.render('image_analysis', subject=subject, grade=grade, language=language)
     
     def _generate_mock_content(self, subject: str, grade: str, language: str, 
                               topic: str, content_type: str) -> str:
@@ -715,5 +840,5 @@ Use the {aid_type} to:
         }
 
 # Initialize AI service
-ai_service = AIService()
+ai_service = AIService(cache=_build_cache(), flight=SingleFlight())
 
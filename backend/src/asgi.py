@@ -0,0 +1,304 @@
+"""ASGI entry point: model-bound endpoints served on an event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+The generation endpoints (plain and streaming) are handled natively here:
+they await AIService's async API, so a request waiting on the model holds
+a coroutine rather than an OS thread and one process can keep thousands
+of generations in flight. Everything else (auth, uploads, listings, jobs,
+batch, static files) is the unchanged Flask app, run on a bounded thread
+pool (SAHAYAK_ASGI_THREADS) behind a small WSGI bridge.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+import main
+import tracing
+import http_cache
+from main import app as flask_app, ai_service, store, generate_id, _sse
+from concurrency_limiter import OverloadedError, request_priority
+
+logger = logging.getLogger(__name__)
+
+# Request bodies above this size are spooled to disk before reaching Flask
+SPOOL_BYTES = 1024 * 1024
+
+_wsgi_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('SAHAYAK_ASGI_THREADS', '32')),
+                                thread_name_prefix='wsgi')
+
+
+# Native async handlers. Each returns (body, status) like main's _run_*
+# functions, or an async iterator of SSE events for streaming endpoints.
+
+async def generate_content(data):
+    result = await ai_service.agenerate_educational_content(
+        **main._content_params(data),
+        use_cache=not data.get('bypassCache', False)
+    )
+    return await asyncio.to_thread(main._save_content, data, result)
+
+async def generate_worksheet(data):
+    result = await ai_service.agenerate_worksheet(
+        **main._worksheet_params(data),
+        use_cache=not data.get('bypassCache', False)
+    )
+    return await asyncio.to_thread(main._save_worksheet, data, result)
+
+async def generate_visual_aid(data):
+    result = await ai_service.agenerate_visual_aid(
+        **main._visual_aid_params(data),
+        use_cache=not data.get('bypassCache', False)
+    )
+    return await asyncio.to_thread(main._save_visual_aid, data, result)
+
+async def stream_content(data):
+    stream = ai_service.astream_educational_content(**main._content_params(data))
+    return _stream_record('content', 'content', 'contentId', data.get('userId', 'demo-user'),
+                          await _start_stream(stream))
+
+async def stream_worksheet(data):
+    stream = ai_service.astream_worksheet(**main._worksheet_params(data))
+    return _stream_record('worksheets', 'worksheet', 'worksheetId', data.get('userId', 'demo-user'),
+                          await _start_stream(stream))
+
+async def stream_visual_aid(data):
+    stream = ai_service.astream_visual_aid(**main._visual_aid_params(data))
+    return _stream_record('visual_aids', 'description', 'aidId', data.get('userId', 'demo-user'),
+                          await _start_stream(stream))
+
+# (method, path) -> (handler, priority, label used in error logs)
+ROUTES = {
+    ('POST', '/api/generate-content'): (generate_content, 'normal', 'Content generation'),
+    ('POST', '/api/generate-worksheet'): (generate_worksheet, 'normal', 'Worksheet generation'),
+    ('POST', '/api/generate-visual-aid'): (generate_visual_aid, 'normal', 'Visual aid generation'),
+    ('POST', '/api/generate-content/stream'): (stream_content, 'high', 'Content streaming'),
+    ('POST', '/api/generate-worksheet/stream'): (stream_worksheet, 'high', 'Worksheet streaming'),
+    ('POST', '/api/generate-visual-aid/stream'): (stream_visual_aid, 'high', 'Visual aid streaming'),
+}
+
+
+async def _start_stream(stream):
+    """Pull the first item inside the request, so a shed call is still a plain 429"""
+    first = await stream.__anext__()
+
+    async def relay():
+        yield first
+        async for item in stream:
+            yield item
+    return relay()
+
+async def _stream_record(collection, field, id_key, user_id, stream):
+    """Relay an async text stream as SSE chunk events, then persist the assembled record"""
+    parts = []
+    metadata = None
+    try:
+        async for item in stream:
+            if isinstance(item, dict):
+                metadata = item
+                continue
+            parts.append(item)
+            yield _sse('chunk', {'text': item})
+
+        record_id = generate_id()
+        await asyncio.to_thread(store.insert, collection, {
+            'id': record_id,
+            'userId': user_id,
+            field: ''.join(parts),
+            'metadata': metadata,
+            'createdAt': time.time()
+        })
+        yield _sse('done', {'success': True, id_key: record_id, 'metadata': metadata})
+    except Exception as e:
+        logger.error(f"Streaming {collection} error: {str(e)}")
+        yield _sse('error', {'error': str(e)})
+    finally:
+        await stream.aclose()
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    route = ROUTES.get((scope['method'], scope['path']))
+    if route is None:
+        return await _wsgi(scope, receive, send)
+    await _handle(scope, receive, send, *route)
+
+async def _handle(scope, receive, send, handler, priority, label):
+    path, method = scope['path'], scope['method']
+    started = time.perf_counter()
+    main.HTTP_IN_FLIGHT.inc(path)
+    request_headers = _headers(scope)
+    trace = tracing.start_trace(tracing.trace_id_from_headers(request_headers))
+    status = 500
+    try:
+        body = await _read_body(receive)
+        if body is None:
+            # Client closed the request before sending it all (nginx's 499)
+            status = 499
+            return
+        main.HTTP_REQUEST_SIZE.observe(len(body), path)
+        try:
+            with request_priority(priority):
+                result = await handler(flask_app.json.loads(body))
+        except OverloadedError as e:
+            result = ({'error': str(e), 'retryAfter': e.retry_after}, 429, {'Retry-After': str(e.retry_after)})
+        except Exception as e:
+            logger.error(f"{label} error: {str(e)}")
+            result = ({'error': str(e)}, 500)
+
+        if isinstance(result, tuple):
+            payload, status, *extra = result
+            data = flask_app.json.dumps_bytes(payload) + b'\n'
+            headers = [(b'content-type', b'application/json')]
+            if len(data) >= main.COMPRESS_MIN_BYTES:
+                # As main's _compress_json does for the Flask routes
+                headers.append((b'vary', b'Accept-Encoding'))
+                encoding = http_cache.negotiate(parse_accept_header(request_headers.get('Accept-Encoding')))
+                if encoding is not None:
+                    data = http_cache.compress(data, encoding)
+                    headers.append((b'content-encoding', encoding.encode()))
+            headers.append((b'content-length', str(len(data)).encode()))
+            headers += [(name.lower().encode(), value.encode()) for name, value in (extra[0] if extra else {}).items()]
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers + _trace_headers(trace)})
+            await send({'type': 'http.response.body', 'body': data})
+            main.HTTP_RESPONSE_SIZE.observe(len(data), path)
+        else:
+            status = 200
+            await send({'type': 'http.response.start', 'status': status, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no')
+            ] + _trace_headers(trace)})
+            try:
+                async for event in result:
+                    await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                await result.aclose()
+    finally:
+        main.HTTP_DURATION.observe(time.perf_counter() - started, path, method)
+        main.HTTP_REQUESTS.inc(path, method, str(status))
+        main.HTTP_IN_FLIGHT.dec(path)
+        tracing.end_trace()
+
+def _headers(scope):
+    return Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+
+def _trace_headers(trace):
+    # CORS as flask_cors would answer for the bridged routes
+    return [
+        (b'access-control-allow-origin', b'*'),
+        (b'x-trace-id', trace.id.encode()),
+        (b'server-timing', trace.server_timing().encode())
+    ]
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            close = getattr(ai_service.backend, 'close', None)
+            if close is not None:
+                close()
+            _wsgi_pool.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+# WSGI bridge for the rest of the Flask app
+
+async def _wsgi(scope, receive, send):
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(_wsgi_pool, _run_wsgi, _environ(scope, body), send, loop)
+    finally:
+        body.close()
+
+def _run_wsgi(environ, send, loop):
+    """Run the Flask app on a pool thread, handing each body chunk to the event loop as it is produced"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response.get('started'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        return lambda data: emit(data, True)
+
+    def emit(data, more_body):
+        if not response.get('started'):
+            response['started'] = True
+            asyncio.run_coroutine_threadsafe(send({
+                'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']
+            }), loop).result()
+        asyncio.run_coroutine_threadsafe(send({
+            'type': 'http.response.body', 'body': data, 'more_body': more_body
+        }), loop).result()
+
+    iterable = flask_app(environ, start_response)
+    try:
+        for chunk in iterable:
+            if chunk:
+                emit(chunk, True)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    emit(b'', False)
+
+def _environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'SERVER_NAME': (scope.get('server') or ('localhost', 80))[0],
+        'SERVER_PORT': str((scope.get('server') or ('localhost', 80))[1]),
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
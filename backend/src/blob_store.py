@@ -0,0 +1,273 @@
+import os
+import re
+import mmap
+import time
+import base64
+import binascii
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, BinaryIO, Iterator
+
+CHUNK_SIZE = 64 * 1024
+_BLOB_ID = re.compile(r'^[0-9a-f]{64}$')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class InvalidUploadError(ValueError):
+    """Raised when an upload's bytes can't be stored, e.g. inline base64 that doesn't decode"""
+
+
+class EmptyUploadError(InvalidUploadError):
+    """Raised when an upload has no bytes, before anything is stored"""
+
+
+class BlobStore:
+    """Content-addressed media store on local disk.
+
+    Blobs are named by the SHA-256 of their bytes (fanned out into
+    ab/cdef... directories), so uploading the same textbook page twice
+    stores it once. Uploads are streamed to a temporary file in CHUNK_SIZE
+    pieces while hashing, then renamed into place, so memory per upload is
+    bounded. A small SQLite index next to the blobs tracks size, content
+    type and how many records reference each blob; gc() removes blobs that
+    have been unreferenced for longer than a grace period (uploads that were
+    never attached, inline media of failed requests, media of deleted
+    records).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'blobs.db'), check_same_thread=False,
+                                   timeout=30, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                id TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                content_type TEXT NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                unreferenced_since REAL
+            )
+        ''')
+
+    # Writing
+
+    def save_stream(self, stream: BinaryIO, content_type: Optional[str] = None) -> Dict[str, Any]:
+        """Copy a binary stream into the store and return a reference to it"""
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+            if size == 0:
+                raise EmptyUploadError('upload is empty')
+
+            blob_id = digest.hexdigest()
+            path = self.path(blob_id)
+            content_type = content_type or 'application/octet-stream'
+            # In gc's transaction, so gc can't delete a blob between this finding it and indexing it
+            with self._transaction():
+                if os.path.exists(path):
+                    # Identical bytes are already stored
+                    os.unlink(temp_path)
+                    deduplicated = True
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temp_path, path)
+                    deduplicated = False
+                # A re-upload of an unreferenced blob restarts its grace period, which holds
+                # it until the record that will reference it is stored
+                self._db.execute(
+                    'INSERT INTO blobs (id, size, content_type, refcount, created_at, unreferenced_since) '
+                    'VALUES (?, ?, ?, 0, ?, ?) '
+                    'ON CONFLICT(id) DO UPDATE SET unreferenced_since = '
+                    'CASE WHEN refcount = 0 THEN excluded.unreferenced_since ELSE NULL END',
+                    (blob_id, size, content_type, time.time(), time.time())
+                )
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        return {
+            'uploadId': blob_id,
+            'size': size,
+            'contentType': content_type,
+            'sha256': blob_id,
+            'deduplicated': deduplicated
+        }
+
+    def save_base64(self, data: str, content_type: Optional[str] = None) -> Dict[str, Any]:
+        """Store a legacy base64 payload (optionally a data: URL)"""
+        if data.startswith('data:') and ',' in data:
+            header, data = data.split(',', 1)
+            content_type = content_type or header[len('data:'):].split(';')[0]
+        try:
+            return self.save_stream(_Base64Reader(data), content_type)
+        except (binascii.Error, ValueError) as e:
+            if isinstance(e, InvalidUploadError):
+                raise
+            raise InvalidUploadError(f"not valid base64 ({e})") from e
+
+    # Reference counting
+
+    def incref(self, blob_id: str):
+        """Record that one more stored record points at this blob"""
+        with self._lock:
+            self._db.execute(
+                'UPDATE blobs SET refcount = refcount + 1, unreferenced_since = NULL WHERE id = ?',
+                (blob_id,)
+            )
+
+    def decref(self, blob_id: str):
+        """Drop one reference; the blob becomes collectable when none remain"""
+        with self._lock:
+            self._db.execute(
+                'UPDATE blobs SET refcount = MAX(refcount - 1, 0), '
+                'unreferenced_since = CASE WHEN refcount <= 1 THEN ? ELSE NULL END WHERE id = ?',
+                (time.time(), blob_id)
+            )
+
+    def gc(self, grace_seconds: float = 24 * 3600) -> Dict[str, int]:
+        """Delete blobs unreferenced for longer than grace_seconds, plus orphaned files"""
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        with self._transaction():
+            rows = self._db.execute(
+                'SELECT id, size FROM blobs WHERE refcount = 0 AND unreferenced_since < ?', (cutoff,)
+            ).fetchall()
+            for blob_id, size in rows:
+                self._db.execute('DELETE FROM blobs WHERE id = ? AND refcount = 0', (blob_id,))
+                try:
+                    os.unlink(self.path(blob_id))
+                    removed += 1
+                    freed += size
+                except FileNotFoundError:
+                    pass
+            known = {row[0] for row in self._db.execute('SELECT id FROM blobs')}
+
+        # Files left behind by a crash between writing and indexing
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                blob_id = os.path.basename(root) + name
+                try:
+                    if _BLOB_ID.match(blob_id) and blob_id not in known and os.path.getmtime(path) < cutoff:
+                        with self._transaction():
+                            # A save may have indexed it since (deduplicating against the file)
+                            if self._db.execute('SELECT 1 FROM blobs WHERE id = ?', (blob_id,)).fetchone():
+                                continue
+                            freed += os.path.getsize(path)
+                            os.unlink(path)
+                            removed += 1
+                    elif name.endswith('.part') and os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                except FileNotFoundError:
+                    # Renamed into place or removed by a concurrent save since the walk listed it
+                    pass
+        return {'removed': removed, 'bytesFreed': freed}
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the index's write lock, which also excludes gc and saves in other processes"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    # Reading
+
+    def path(self, blob_id: str) -> str:
+        if not _BLOB_ID.match(blob_id):
+            raise KeyError(blob_id)
+        return os.path.join(self.directory, blob_id[:2], blob_id[2:])
+
+    def exists(self, blob_id: str) -> bool:
+        try:
+            return os.path.exists(self.path(blob_id))
+        except KeyError:
+            return False
+
+    def info(self, blob_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT size, content_type, refcount FROM blobs WHERE id = ?', (blob_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'uploadId': blob_id, 'size': row[0], 'contentType': row[1], 'refcount': row[2]}
+
+    @contextmanager
+    def view(self, blob_id: str) -> Iterator[memoryview]:
+        """Memory-map a blob read-only and yield a zero-copy view of its bytes"""
+        with open(self.path(blob_id), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b'')
+                return
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+                mapped.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size, referenced = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount > 0), 0) FROM blobs'
+            ).fetchone()
+        return {'blobs': count, 'bytes': size, 'referenced': referenced}
+
+
+class _Base64Reader:
+    """File-like reader that decodes a base64 string a chunk at a time.
+
+    Whitespace (as in MIME-wrapped base64) is skipped, and characters past
+    the last full 4-character group are carried over to the next read.
+    """
+
+    def __init__(self, data: str):
+        self._data = data
+        self._position = 0
+        self._pending = ''
+        self._step = (CHUNK_SIZE // 3) * 4
+
+    def read(self, size: int = -1) -> bytes:
+        while self._position < len(self._data):
+            chunk = self._data[self._position:self._position + self._step]
+            self._position += self._step
+            self._pending += _WHITESPACE.sub('', chunk)
+            usable = len(self._pending) - len(self._pending) % 4
+            if usable:
+                chunk, self._pending = self._pending[:usable], self._pending[usable:]
+                return base64.b64decode(chunk, validate=True)
+        # Whatever is left is not a whole group; decoding reports it as bad padding
+        chunk, self._pending = self._pending, ''
+        return base64.b64decode(chunk, validate=True)
@@ -0,0 +1,138 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+# Share of the current limit each priority may occupy. Lower priorities are
+# shed first, leaving headroom for the requests people are watching.
+PRIORITY_SHARES = {'high': 1.0, 'normal': 0.8, 'low': 0.5}
+
+# Priority of the request on this thread; None means "not admission controlled"
+_current_priority: ContextVar[Optional[str]] = ContextVar('sahayak_priority', default=None)
+
+
+class OverloadedError(Exception):
+    """Raised when a call is shed because the upstream is at its concurrency limit"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def request_priority(priority: str):
+    """Run the enclosed code (and the model calls it makes) at the given priority"""
+    if priority not in PRIORITY_SHARES:
+        raise ValueError(f"Unknown priority: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Optional[str]:
+    return _current_priority.get()
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by upstream latency.
+
+    Calls are admitted while fewer than ``limit * share`` are in flight for
+    their priority and rejected immediately otherwise, so a slow upstream
+    never ties up more than ``limit`` request threads. After each call the
+    limit grows by 1/limit (about +1 per round of calls) if the call was
+    quick and the limit was actually in use, and is multiplied by
+    ``backoff`` if the call failed or took longer than ``tolerance`` times
+    the baseline latency. The baseline follows the fastest recent latency
+    and only creeps upwards, so a sustained slowdown is eventually accepted
+    as the new normal rather than shrinking the limit forever.
+    """
+
+    def __init__(self, initial_limit: float = 8, min_limit: float = 1, max_limit: float = 64,
+                 tolerance: float = 2.0, backoff: float = 0.9, baseline_drift: float = 0.01):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baseline_drift = baseline_drift
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._smoothed: Optional[float] = None
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._counts = {'admitted': 0, 'rejected': 0, 'increases': 0, 'decreases': 0}
+        self._rejected_by_priority = {priority: 0 for priority in PRIORITY_SHARES}
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self._limit))
+
+    @contextmanager
+    def acquire(self, priority: str = 'normal'):
+        """Hold one slot for the duration of an upstream call, or raise OverloadedError"""
+        with self._lock:
+            allowed = max(1, int(self._limit * PRIORITY_SHARES[priority]))
+            if self._in_flight >= allowed:
+                self._counts['rejected'] += 1
+                self._rejected_by_priority[priority] += 1
+                raise OverloadedError(
+                    f"Model backend is at capacity ({self._in_flight} calls in flight)",
+                    retry_after=self._retry_after()
+                )
+            self._in_flight += 1
+            self._counts['admitted'] += 1
+            in_flight = self._in_flight
+
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        except GeneratorExit:
+            # A stream abandoned by its client says nothing about upstream health
+            ok = True
+            raise
+        finally:
+            self._release(time.monotonic() - started, ok, in_flight)
+
+    def _release(self, latency: float, ok: bool, in_flight: int):
+        with self._lock:
+            self._in_flight -= 1
+            if self._baseline is None or latency < self._baseline:
+                self._baseline = latency
+            else:
+                self._baseline += (latency - self._baseline) * self.baseline_drift
+            self._smoothed = latency if self._smoothed is None else self._smoothed * 0.9 + latency * 0.1
+
+            now = time.monotonic()
+            if not ok or latency > self._baseline * self.tolerance:
+                # Back off at most once per baseline round trip so one slow
+                # burst doesn't collapse the limit
+                if now - self._last_decrease >= self._baseline:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+                    self._counts['decreases'] += 1
+            elif in_flight * 2 >= self._limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                self._counts['increases'] += 1
+
+    def _retry_after(self) -> int:
+        # Roughly how long until the calls ahead of this one drain
+        latency = self._smoothed or 1.0
+        return int(min(60, max(1, math.ceil(latency * (self._in_flight + 1) / self.limit))))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'inFlight': self._in_flight,
+                'baselineMs': round(self._baseline * 1000, 1) if self._baseline is not None else None,
+                'smoothedLatencyMs': round(self._smoothed * 1000, 1) if self._smoothed is not None else None,
+                **self._counts,
+                'rejectedByPriority': dict(self._rejected_by_priority)
+            }
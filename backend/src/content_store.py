@@ -0,0 +1,201 @@
+import json
+import bisect
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+COLLECTIONS = ('content', 'worksheets', 'visual_aids', 'assessments', 'videos')
+
+
+class ContentStore:
+    """In-process store for generated records with per-user indexes.
+
+    Every collection keeps its records by id plus two secondary indexes, one
+    per userId and one per (userId, content_type), each holding record ids
+    in ascending order. Ids are time-sortable (see ids.py), so id order is
+    creation order and doubles as the pagination key. Listing a user's newest records
+    walks the tail of their index, so it costs O(page size) no matter how
+    many records other users have.
+
+    Per-user counters (records per collection, per subject and per
+    content_type) are maintained on every insert and delete so statistics
+    are a lookup rather than a scan.
+    """
+
+    def __init__(self, collections=COLLECTIONS):
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self._records: Dict[str, Dict[str, Dict[str, Any]]] = {name: {} for name in collections}
+        self._by_user: Dict[str, Dict[str, List[str]]] = {
+            name: defaultdict(list) for name in collections
+        }
+        self._by_user_type: Dict[str, Dict[Tuple[str, str], List[str]]] = {
+            name: defaultdict(list) for name in collections
+        }
+        self._stats: Dict[str, Dict[str, Counter]] = defaultdict(_empty_stats)
+        # Records serialized by get_json, kept until the record is replaced or deleted
+        self._serialized: Dict[str, Dict[str, bytes]] = {name: {} for name in collections}
+        self._lock = threading.RLock()
+
+    @property
+    def collections(self):
+        return tuple(self._records)
+
+    def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.users.get(email)
+
+    def save_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        self.users[user['email']] = user
+        return user
+
+    def insert(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a record (which must carry id, userId and createdAt) and index it"""
+        entry = record['id']
+        content_type = _content_type(record)
+        with self._lock:
+            records = self._records[collection]
+            if record['id'] in records:
+                self._unindex(collection, records[record['id']])
+                self._serialized[collection].pop(record['id'], None)
+            records[record['id']] = record
+            # Ids are generated in increasing order, so this is almost always an append
+            bisect.insort(self._by_user[collection][record['userId']], entry)
+            if content_type is not None:
+                bisect.insort(self._by_user_type[collection][(record['userId'], content_type)], entry)
+            _count(self._stats[record['userId']], collection, record, 1)
+        return record
+
+    def insert_many(self, collection: str, records: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            for record in records:
+                self.insert(collection, record)
+        return len(records)
+
+    def get(self, collection: str, record_id: str) -> Optional[Dict[str, Any]]:
+        return self._records[collection].get(record_id)
+
+    def get_json(self, collection: str, record_id: str) -> Optional[bytes]:
+        """The record serialized as JSON, encoded once and then served from memory"""
+        data = self._serialized[collection].get(record_id)
+        if data is not None:
+            return data
+        with self._lock:
+            record = self._records[collection].get(record_id)
+            if record is None:
+                return None
+            data = self._serialized[collection][record_id] = record_json(record).encode('utf-8')
+        return data
+
+    def delete(self, collection: str, record_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records[collection].pop(record_id, None)
+            if record is not None:
+                self._unindex(collection, record)
+                self._serialized[collection].pop(record_id, None)
+            return record
+
+    def list_user(self, collection: str, user_id: str, content_type: Optional[str] = None,
+                  limit: Optional[int] = None,
+                  after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return a user's records newest first, optionally filtered by content_type.
+
+        ``after`` is the id of the last record of the previous page; only
+        records strictly older than it are returned.
+        """
+        with self._lock:
+            if content_type:
+                index = self._by_user_type[collection].get((user_id, content_type), ())
+            else:
+                index = self._by_user[collection].get(user_id, ())
+            end = len(index) if after is None else bisect.bisect_left(index, after)
+            records = self._records[collection]
+            start = 0 if limit is None else max(0, end - limit)
+            return [records[index[position]] for position in range(end - 1, start - 1, -1)]
+
+    def count_user(self, collection: str, user_id: str) -> int:
+        return len(self._by_user[collection].get(user_id, ()))
+
+    def user_stats(self, user_id: str) -> Dict[str, Dict[str, int]]:
+        """Return a user's counters: collections, subjects and contentTypes"""
+        with self._lock:
+            stats = self._stats.get(user_id)
+            if stats is None:
+                return {name: {} for name in _empty_stats()}
+            return {name: dict(counter) for name, counter in stats.items()}
+
+    def verify_stats(self) -> List[str]:
+        """Recount every record and return the ids of users whose counters disagree"""
+        with self._lock:
+            expected = self._recount()
+            user_ids = set(expected) | set(self._stats)
+            return sorted(user_id for user_id in user_ids
+                          if _compact(expected.get(user_id)) != _compact(self._stats.get(user_id)))
+
+    def rebuild_stats(self) -> int:
+        """Replace all counters with a fresh recount; returns the number of users"""
+        with self._lock:
+            self._stats = self._recount()
+            return len(self._stats)
+
+    def _recount(self) -> Dict[str, Dict[str, Counter]]:
+        stats: Dict[str, Dict[str, Counter]] = defaultdict(_empty_stats)
+        for collection, records in self._records.items():
+            for record in records.values():
+                _count(stats[record['userId']], collection, record, 1)
+        return stats
+
+    def _unindex(self, collection: str, record: Dict[str, Any]):
+        entry = record['id']
+        _count(self._stats[record['userId']], collection, record, -1)
+        _remove(self._by_user[collection], record['userId'], entry)
+        content_type = _content_type(record)
+        if content_type is not None:
+            _remove(self._by_user_type[collection], (record['userId'], content_type), entry)
+
+
+def _content_type(record: Dict[str, Any]) -> Optional[str]:
+    return (record.get('metadata') or {}).get('content_type')
+
+
+def _empty_stats() -> Dict[str, Counter]:
+    return {'collections': Counter(), 'subjects': Counter(), 'contentTypes': Counter()}
+
+
+def stat_keys(collection: str, record: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """The (dimension, key) counters a record contributes to"""
+    metadata = record.get('metadata') or {}
+    keys = (('collections', collection),
+            ('subjects', metadata.get('subject')),
+            ('contentTypes', metadata.get('content_type')))
+    return [(name, key) for name, key in keys if key is not None]
+
+
+def record_json(record: Dict[str, Any]) -> str:
+    """A record as JSON in the API's own encoding (sorted keys, compact, UTF-8), so it can be sent as stored"""
+    return json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _count(stats: Dict[str, Counter], collection: str, record: Dict[str, Any], delta: int):
+    for name, key in stat_keys(collection, record):
+        counter = stats[name]
+        counter[key] += delta
+        if counter[key] <= 0:
+            del counter[key]
+
+
+def _compact(stats: Optional[Dict[str, Counter]]) -> Dict[str, Dict[str, int]]:
+    """Counters without zero entries, for comparing two sets of stats"""
+    if not stats:
+        return {}
+    return {name: {key: value for key, value in counter.items() if value}
+            for name, counter in stats.items() if any(counter.values())}
+
+
+def _remove(index: Dict[Any, List[str]], key: Any, entry: str):
+    entries = index.get(key)
+    if not entries:
+        return
+    position = bisect.bisect_left(entries, entry)
+    if position < len(entries) and entries[position] == entry:
+        del entries[position]
+    if not entries:
+        del index[key]
@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+from functools import wraps
+from typing import Optional
+
+from flask import Response, current_app, request
+from werkzeug.datastructures import Accept
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it JSON responses are gzip-only
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+# Cheap settings: these run per response, unlike the static assets compressed once at startup
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+# Users' records and stats: browsers may keep them but must revalidate, shared caches must not
+CACHE_CONTROL = 'private, no-cache'
+
+
+def conditional(view):
+    """Give a view's 200 responses an ETag and answer a matching If-None-Match with 304.
+
+    The ETag is a hash of the JSON body, so it changes exactly when the
+    response would; an unchanged dashboard refresh costs the lookup but
+    sends no body. It is weak because compression is negotiated per request:
+    the gzip, brotli and plain bodies share one validator.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=12).hexdigest(), weak=True)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        etag, _ = response.get_etag()
+        if request.if_none_match.contains_weak(etag):
+            # Werkzeug drops the entity headers of a 304 when it is sent
+            response.status_code = 304
+            response.set_data(b'')
+        return response
+    return wrapper
+
+
+def negotiate(accepted: Accept) -> Optional[str]:
+    for encoding in ENCODINGS:
+        if accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response: Response, min_bytes: int) -> Response:
+    """Compress a buffered JSON response of at least min_bytes in the best encoding the client accepts"""
+    if (response.mimetype != 'application/json' or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.status_code in (204, 304)):
+        return response
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is not None:
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
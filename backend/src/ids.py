@@ -0,0 +1,80 @@
+import os
+import re
+import time
+import threading
+
+# Snowflake-style layout: 42 bits of milliseconds since EPOCH_MS, 10 bits of
+# node id and 12 bits of per-millisecond sequence. Rendered as fixed-width hex
+# so that string order is creation order.
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+PREFIX = 'id_'
+ID_FORMAT = re.compile(rf'{PREFIX}[0-9a-f]{{16}}')
+
+
+def _default_node_id() -> int:
+    """SAHAYAK_NODE_ID if set, otherwise derived from the process id"""
+    configured = os.environ.get('SAHAYAK_NODE_ID')
+    if configured is not None:
+        return int(configured) & MAX_NODE
+    return os.getpid() & MAX_NODE
+
+
+class IdGenerator:
+    """Thread-safe, monotonic, k-sortable id generator.
+
+    Ids from one process are strictly increasing. Ids from different
+    processes are ordered by millisecond and never collide as long as the
+    processes have different node ids. If the clock steps backwards or more
+    than 4096 ids are requested within one millisecond, the generator keeps
+    counting from its last timestamp instead of repeating values.
+    """
+
+    def __init__(self, node_id: int = None):
+        self.node_id = _default_node_id() if node_id is None else node_id & MAX_NODE
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_int(self) -> int:
+        now_ms = time.time_ns() // 1_000_000 - EPOCH_MS
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    # Borrow the next millisecond rather than block
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self) -> str:
+        return f"{PREFIX}{self.next_int():016x}"
+
+    def reset_node(self, node_id: int = None):
+        """Pick a new node id, e.g. in a freshly forked worker process"""
+        with self._lock:
+            self.node_id = _default_node_id() if node_id is None else node_id & MAX_NODE
+
+
+def is_id(value: str) -> bool:
+    """Whether value has the shape of an id produced by IdGenerator"""
+    return ID_FORMAT.fullmatch(value) is not None
+
+
+def timestamp_of(record_id: str) -> float:
+    """Creation time (unix seconds) encoded in an id produced by IdGenerator"""
+    value = int(record_id[len(PREFIX):], 16)
+    return ((value >> (NODE_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000
+
+
+id_generator = IdGenerator()
+
+# Forked workers inherit the parent's generator; give each child its own node id
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=id_generator.reset_node)
@@ -0,0 +1,285 @@
+import json
+import time
+import uuid
+import queue
+import socket
+import logging
+import ipaddress
+import threading
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A job handler takes the request payload and returns (response_body, http_status)
+JobHandler = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class InvalidWebhookError(ValueError):
+    """Raised when a webhook URL is not one the server may call"""
+
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the delivery at an address the URL check refused
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirects)
+
+
+class JobQueue:
+    """Bounded worker pool that runs slow AI calls outside the request thread.
+
+    Jobs run in the process that accepted them. With ``records`` (e.g.
+    sqlite_store.SqliteJobRecords) every status change is also written to a
+    store shared between processes, so get() finds jobs submitted to any
+    worker process.
+
+    Webhooks must be http(s). With ``webhook_hosts`` only those hosts are
+    called; without it, any host that resolves to a public address. They
+    are delivered from their own small pool, so a slow receiver never
+    holds up a job worker.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 1000,
+                 retention: float = 3600, webhook_timeout: float = 5.0, records=None,
+                 webhook_hosts: Optional[Iterable[str]] = None, webhook_workers: int = 2):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.webhook_timeout = webhook_timeout
+        self.records = records
+        self.webhook_hosts = {host.lower() for host in webhook_hosts} if webhook_hosts else None
+        self._webhooks = ThreadPoolExecutor(max_workers=webhook_workers, thread_name_prefix='job-webhook')
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_pending)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._counts = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=1000)
+
+    def register(self, job_type: str, handler: JobHandler):
+        """Register the handler that runs jobs of the given type"""
+        self._handlers[job_type] = handler
+
+    @property
+    def job_types(self):
+        return sorted(self._handlers)
+
+    def submit(self, job_type: str, payload: Dict[str, Any],
+               webhook_url: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job and return its record without waiting for it to run"""
+        if job_type not in self._handlers:
+            raise KeyError(job_type)
+        if webhook_url is not None:
+            self.check_webhook(webhook_url)
+
+        self._ensure_workers()
+        self._prune()
+
+        job_id = f"job_{uuid.uuid4().hex}"
+        job = {
+            'id': job_id,
+            'type': job_type,
+            'status': 'queued',
+            'payload': payload,
+            'webhookUrl': webhook_url,
+            'result': None,
+            'error': None,
+            'statusCode': None,
+            'createdAt': time.time(),
+            'startedAt': None,
+            'finishedAt': None
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            snapshot = self.describe(job)
+        # Published before a worker can pick the job up, so 'queued' never lands after its result
+        self._publish(snapshot)
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                self._counts['rejected'] += 1
+            if self.records is not None:
+                self.records.discard(job_id)
+            raise QueueFullError(f"Job queue is full ({self.max_pending} pending)")
+
+        with self._lock:
+            self._counts['submitted'] += 1
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the public view of a job, or None if it is unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return self.describe(job)
+        return self.records.get(job_id) if self.records else None
+
+    def check_webhook(self, url: str):
+        """Raise InvalidWebhookError unless url is an http(s) URL of an allowed host"""
+        try:
+            parts = urllib.parse.urlsplit(url)
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        except (TypeError, ValueError, AttributeError):
+            raise InvalidWebhookError(f"Invalid webhook URL: {url!r}")
+        host = (parts.hostname or '').lower()
+        if parts.scheme not in ('http', 'https') or not host:
+            raise InvalidWebhookError('Webhook URL must be an http or https URL')
+        if self.webhook_hosts is not None:
+            if host not in self.webhook_hosts:
+                raise InvalidWebhookError(f"Webhook host {host} is not allowed")
+            return
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+        except OSError:
+            raise InvalidWebhookError(f"Webhook host {host} does not resolve")
+        for address in addresses:
+            if not ipaddress.ip_address(address.split('%')[0]).is_global:
+                raise InvalidWebhookError(f"Webhook host {host} is not a public address")
+
+    @staticmethod
+    def describe(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job record (the request payload is not echoed back)"""
+        return {key: value for key, value in job.items() if key != 'payload'}
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, worker utilisation and wait/run time summaries"""
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            return {
+                'workers': self.workers,
+                'busyWorkers': self._running,
+                'queueDepth': self._queue.qsize(),
+                'maxPending': self.max_pending,
+                'trackedJobs': len(self._jobs),
+                'counts': dict(self._counts),
+                'waitTime': _summarize(wait_times),
+                'runTime': _summarize(run_times)
+            }
+
+    def _ensure_workers(self):
+        # Workers are started lazily so importing the app (or the reloader
+        # parent process) does not spawn threads that never get used
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker error: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = 'running'
+            job['startedAt'] = time.time()
+            self._wait_times.append(job['startedAt'] - job['createdAt'])
+            self._running += 1
+            snapshot = self.describe(job)
+        self._publish(snapshot)
+
+        try:
+            body, status = self._handlers[job['type']](job['payload'])
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['type']}) error: {str(e)}")
+            body, status = {'error': str(e)}, 500
+
+        with self._lock:
+            job['finishedAt'] = time.time()
+            job['statusCode'] = status
+            if status < 400:
+                job['status'] = 'completed'
+                job['result'] = body
+                self._counts['completed'] += 1
+            else:
+                job['status'] = 'failed'
+                job['error'] = body.get('error', body)
+                self._counts['failed'] += 1
+            self._run_times.append(job['finishedAt'] - job['startedAt'])
+            self._running -= 1
+            # The payload can be large (media uploads), drop it once the job is done
+            job['payload'] = None
+            snapshot = self.describe(job)
+
+        self._publish(snapshot)
+        if job['webhookUrl']:
+            self._webhooks.submit(self._notify, job['webhookUrl'], snapshot)
+
+    def _publish(self, snapshot: Dict[str, Any]):
+        if self.records is None:
+            return
+        try:
+            self.records.put(snapshot)
+        except Exception as e:
+            # Polling from other processes degrades; the job itself carries on
+            logger.error(f"Could not publish job {snapshot['id']}: {str(e)}")
+
+    def _notify(self, url: str, job: Dict[str, Any]):
+        try:
+            # Checked again: the host may resolve elsewhere by now
+            self.check_webhook(url)
+            request = urllib.request.Request(
+                url,
+                data=json.dumps(job).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method='POST'
+            )
+            with _webhook_opener.open(request, timeout=self.webhook_timeout) as response:
+                response.read()
+        except Exception as e:
+            logger.error(f"Webhook delivery for {job['id']} failed: {str(e)}")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finishedAt'] is not None and job['finishedAt'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.records is not None:
+            self.records.prune(cutoff)
+
+
+def _summarize(samples) -> Dict[str, float]:
+    """Summary of a sorted list of durations in seconds"""
+    if not samples:
+        return {'count': 0, 'avg': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    count = len(samples)
+    return {
+        'count': count,
+        'avg': sum(samples) / count,
+        'p50': samples[int(count * 0.50)],
+        'p95': samples[min(count - 1, int(count * 0.95))],
+        'max': samples[-1]
+    }
@@ -0,0 +1,660 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import logging
+import threading
+import http.client
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+from typing import Dict, Any, AsyncIterator, Callable, Iterator, List, Optional
+
+from concurrency_limiter import AdaptiveLimiter, OverloadedError, current_priority
+from resilience import CircuitBreaker, Hedger
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a pooled keep-alive connection went stale and the request can be retried
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                            BrokenPipeError, ConnectionResetError)
+_ASYNC_STALE_CONNECTION_ERRORS = (asyncio.IncompleteReadError, BrokenPipeError, ConnectionResetError)
+
+
+class BackendBusyError(Exception):
+    """Raised when a backend's concurrency limit is reached and no slot frees up in time"""
+
+
+class LLMBackend:
+    """Interface every model backend implements.
+
+    ``generate`` returns the model output for a prompt; ``stream`` yields it in
+    chunks. ``mock`` is a callable producing development output, which only the
+    mock backend uses. With ``response_format='json'`` the output is parsed
+    into Python objects. Calls beyond ``max_concurrency`` wait up to
+    ``timeout`` seconds for a slot. Calls made under a request priority
+    (see concurrency_limiter.request_priority) first pass the adaptive
+    ``limiter``, which rejects them outright when the upstream is saturated.
+    An optional ``breaker`` fails calls fast while the upstream is erroring,
+    and an optional ``hedger`` duplicates slow ``generate`` calls.
+
+    ``agenerate`` and ``astream`` are the event-loop counterparts used by the
+    ASGI app: they await the upstream instead of blocking a thread, and wait
+    for one of a separate set of ``max_concurrency`` slots on the loop.
+    """
+
+    name = 'base'
+
+    def __init__(self, max_concurrency: int = 16, timeout: float = 30.0,
+                 limiter: Optional[AdaptiveLimiter] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 hedger: Optional[Hedger] = None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.limiter = limiter
+        self.breaker = breaker
+        self.hedger = hedger
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Created on first use, and again if calls move to another event loop
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._async_loop = None
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'errors': 0, 'inFlight': 0, 'busyRejections': 0}
+
+    def generate(self, prompt: str, mock: Callable[[], Any], response_format: str = 'text') -> Any:
+        if self.breaker:
+            self.breaker.before_call()
+        try:
+            with self._admit():
+                if self.hedger:
+                    result = self.hedger.call(lambda: self._attempt(prompt, mock, response_format),
+                                              can_hedge=self._has_spare_capacity,
+                                              hedge=lambda: self._attempt(prompt, mock, response_format, wait=False))
+                else:
+                    with self._slot():
+                        result = self._generate(prompt, mock, response_format)
+        except (OverloadedError, BackendBusyError):
+            # Shed locally; the upstream was never asked
+            self._record(None)
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True)
+        return result
+
+    def stream(self, prompt: str, mock: Callable[[], str]) -> Iterator[str]:
+        if self.breaker:
+            self.breaker.before_call()
+        try:
+            with self._admit(), self._slot():
+                yield from self._stream(prompt, mock)
+        except (OverloadedError, BackendBusyError, GeneratorExit):
+            # Shed locally, or the client went away: neither says anything about the upstream
+            self._record(None)
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True)
+
+    async def agenerate(self, prompt: str, mock: Callable[[], Any], response_format: str = 'text') -> Any:
+        if self.breaker:
+            self.breaker.before_call()
+        try:
+            with self._admit():
+                if self.hedger:
+                    result = await self.hedger.acall(
+                        lambda: self._aattempt(prompt, mock, response_format),
+                        can_hedge=self._has_spare_capacity,
+                        hedge=lambda: self._aattempt(prompt, mock, response_format, wait=False)
+                    )
+                else:
+                    async with _AsyncSlot(self):
+                        result = await self._agenerate(prompt, mock, response_format)
+        except (OverloadedError, BackendBusyError, asyncio.CancelledError):
+            # Shed locally, or the client went away
+            self._record(None)
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True)
+        return result
+
+    async def astream(self, prompt: str, mock: Callable[[], str]) -> AsyncIterator[str]:
+        if self.breaker:
+            self.breaker.before_call()
+        try:
+            with self._admit():
+                async with _AsyncSlot(self):
+                    stream = self._astream(prompt, mock)
+                    try:
+                        async for chunk in stream:
+                            yield chunk
+                    finally:
+                        await stream.aclose()
+        except (OverloadedError, BackendBusyError, GeneratorExit, asyncio.CancelledError):
+            self._record(None)
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True)
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit breaker is refusing calls"""
+        return not (self.breaker and self.breaker.is_open)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {'backend': self.name, 'maxConcurrency': self.max_concurrency, **self._counts}
+        stats['limiter'] = self.limiter.stats() if self.limiter else None
+        stats['circuitBreaker'] = self.breaker.stats() if self.breaker else None
+        stats['hedging'] = self.hedger.stats() if self.hedger else None
+        return stats
+
+    def _record(self, ok: Optional[bool]):
+        if self.breaker:
+            self.breaker.record(ok)
+
+    def _has_spare_capacity(self) -> bool:
+        # Hedges are extra load; only send them while the upstream has room
+        with self._lock:
+            in_flight = self._counts['inFlight']
+        limit = self.limiter.limit if self.limiter else self.max_concurrency
+        return in_flight < limit
+
+    def _attempt(self, prompt: str, mock: Callable[[], Any], response_format: str, wait: bool = True) -> Any:
+        # Each hedged attempt holds its own slot, so a loser still running counts against max_concurrency
+        with _Slot(self, wait):
+            return self._generate(prompt, mock, response_format)
+
+    async def _aattempt(self, prompt: str, mock: Callable[[], Any], response_format: str,
+                        wait: bool = True) -> Any:
+        async with _AsyncSlot(self, wait):
+            return await self._agenerate(prompt, mock, response_format)
+
+    def _generate(self, prompt: str, mock: Callable[[], Any], response_format: str) -> Any:
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, mock: Callable[[], str]) -> Iterator[str]:
+        raise NotImplementedError
+
+    async def _agenerate(self, prompt: str, mock: Callable[[], Any], response_format: str) -> Any:
+        raise NotImplementedError
+
+    def _astream(self, prompt: str, mock: Callable[[], str]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    def _admit(self):
+        # Background work (jobs, CLI) has no priority and is bounded by its own pool
+        priority = current_priority()
+        if self.limiter is None or priority is None:
+            return nullcontext()
+        return self.limiter.acquire(priority)
+
+    def _slot(self):
+        return _Slot(self)
+
+
+class _Slot:
+    """Context manager holding one of a backend's concurrency slots.
+
+    With ``wait=False`` (hedges) it fails at once instead of queueing for a slot.
+    """
+
+    def __init__(self, backend: LLMBackend, wait: bool = True):
+        self.backend = backend
+        self.wait = wait
+
+    def __enter__(self):
+        backend = self.backend
+        if not self.wait:
+            if not backend._slots.acquire(blocking=False):
+                raise BackendBusyError(f"{backend.name} backend has no spare slot for a hedge")
+        elif not backend._slots.acquire(timeout=backend.timeout):
+            with backend._lock:
+                backend._counts['busyRejections'] += 1
+            raise BackendBusyError(f"{backend.name} backend is at its concurrency limit")
+        with backend._lock:
+            backend._counts['requests'] += 1
+            backend._counts['inFlight'] += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        backend = self.backend
+        with backend._lock:
+            backend._counts['inFlight'] -= 1
+            if exc_type is not None and exc_type is not GeneratorExit:
+                backend._counts['errors'] += 1
+        backend._slots.release()
+        return False
+
+
+class _AsyncSlot:
+    """Async context manager holding one of a backend's event-loop concurrency slots"""
+
+    def __init__(self, backend: LLMBackend, wait: bool = True):
+        self.backend = backend
+        self.wait = wait
+
+    async def __aenter__(self):
+        backend = self.backend
+        loop = asyncio.get_running_loop()
+        if backend._async_loop is not loop:
+            backend._async_slots = asyncio.Semaphore(backend.max_concurrency)
+            backend._async_loop = loop
+        if not self.wait and backend._async_slots.locked():
+            raise BackendBusyError(f"{backend.name} backend has no spare slot for a hedge")
+        try:
+            await asyncio.wait_for(backend._async_slots.acquire(), backend.timeout)
+        except asyncio.TimeoutError:
+            with backend._lock:
+                backend._counts['busyRejections'] += 1
+            raise BackendBusyError(f"{backend.name} backend is at its concurrency limit")
+        with backend._lock:
+            backend._counts['requests'] += 1
+            backend._counts['inFlight'] += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        backend = self.backend
+        with backend._lock:
+            backend._counts['inFlight'] -= 1
+            if exc_type is not None and exc_type not in (GeneratorExit, asyncio.CancelledError):
+                backend._counts['errors'] += 1
+        backend._async_slots.release()
+        return False
+
+
+class MockBackend(LLMBackend):
+    """Development backend: sleeps for the usual model latency and returns mock output"""
+
+    name = 'mock'
+
+    def __init__(self, latency: float = 2.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def _generate(self, prompt, mock, response_format):
+        time.sleep(self.latency)
+        return mock()
+
+    def _stream(self, prompt, mock, chunk_lines: int = 4):
+        # Yield a few lines at a time, spread over the usual latency
+        lines = mock().splitlines(keepends=True)
+        chunks = [''.join(lines[i:i + chunk_lines]) for i in range(0, len(lines), chunk_lines)]
+        delay = self.latency / max(len(chunks), 1)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+
+    async def _agenerate(self, prompt, mock, response_format):
+        await asyncio.sleep(self.latency)
+        return mock()
+
+    async def _astream(self, prompt, mock, chunk_lines: int = 4):
+        lines = mock().splitlines(keepends=True)
+        chunks = [''.join(lines[i:i + chunk_lines]) for i in range(0, len(lines), chunk_lines)]
+        delay = self.latency / max(len(chunks), 1)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+
+class HTTPBackend(LLMBackend):
+    """Model server spoken to over HTTP/1.1 with a pool of keep-alive connections.
+
+    POST {path} with {"prompt", "max_tokens", "temperature", "response_format"}
+    returns {"text": ...}; with "stream": true the server answers with
+    newline-delimited JSON objects, each carrying a "text" chunk.
+    """
+
+    name = 'http'
+
+    def __init__(self, url: str, pool_size: Optional[int] = None, max_tokens: int = 2048,
+                 temperature: float = 0.7, **kwargs):
+        super().__init__(**kwargs)
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.path = parts.path or '/v1/generate'
+        self.https = parts.scheme == 'https'
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.pool_size = self.max_concurrency if pool_size is None else pool_size
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        # Keep-alive connections for async calls; only touched from the event loop
+        self._async_idle: List[_AsyncConnection] = []
+        self._counts.update({'connectionsOpened': 0, 'connectionsReused': 0})
+
+    def close(self):
+        while self._async_idle:
+            self._async_idle.pop().close()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _generate(self, prompt, mock, response_format):
+        response, connection = self._send(prompt, response_format, stream=False)
+        try:
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection, response)
+        if response.status != 200:
+            raise RuntimeError(f"Model server returned {response.status}: {body[:200]!r}")
+        text = json.loads(body)['text']
+        return json.loads(text) if response_format == 'json' else text
+
+    def _stream(self, prompt, mock):
+        response, connection = self._send(prompt, 'text', stream=True)
+        if response.status != 200:
+            body = response.read()
+            self._release(connection, response)
+            raise RuntimeError(f"Model server returned {response.status}: {body[:200]!r}")
+        try:
+            for line in response:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)['text']
+        except BaseException:
+            # Abandoned half-way: the connection is in an unknown state
+            connection.close()
+            raise
+        self._release(connection, response)
+
+    async def _agenerate(self, prompt, mock, response_format):
+        connection = await self._asend(prompt, response_format, stream=False)
+        try:
+            body = await asyncio.wait_for(connection.read(), self.timeout)
+        except BaseException:
+            connection.close()
+            raise
+        self._arelease(connection)
+        if connection.status != 200:
+            raise RuntimeError(f"Model server returned {connection.status}: {body[:200]!r}")
+        text = json.loads(body)['text']
+        return json.loads(text) if response_format == 'json' else text
+
+    async def _astream(self, prompt, mock):
+        connection = await self._asend(prompt, 'text', stream=True)
+        try:
+            if connection.status != 200:
+                body = await connection.read()
+                raise RuntimeError(f"Model server returned {connection.status}: {body[:200]!r}")
+            async for line in connection.lines():
+                line = line.strip()
+                if line:
+                    yield json.loads(line)['text']
+        except BaseException:
+            connection.close()
+            raise
+        self._arelease(connection)
+
+    async def _asend(self, prompt: str, response_format: str, stream: bool) -> '_AsyncConnection':
+        body = self._body(prompt, response_format, stream)
+        loop = asyncio.get_running_loop()
+        while self._async_idle and self._async_idle[-1].loop is not loop:
+            # Left over from an event loop that has since been replaced
+            self._async_idle.pop().close()
+        if self._async_idle:
+            connection = self._async_idle.pop()
+            with self._lock:
+                self._counts['connectionsReused'] += 1
+            try:
+                await asyncio.wait_for(connection.request(self.host, self.path, body), self.timeout)
+                return connection
+            except _ASYNC_STALE_CONNECTION_ERRORS:
+                connection.close()
+            except BaseException:
+                connection.close()
+                raise
+            logger.debug("Pooled connection to %s:%s went stale, reconnecting", self.host, self.port)
+
+        with self._lock:
+            self._counts['connectionsOpened'] += 1
+        connection = await asyncio.wait_for(_AsyncConnection.open(self.host, self.port, self.https), self.timeout)
+        try:
+            await asyncio.wait_for(connection.request(self.host, self.path, body), self.timeout)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _arelease(self, connection: '_AsyncConnection'):
+        if connection.will_close or len(self._async_idle) >= self.pool_size:
+            connection.close()
+        else:
+            self._async_idle.append(connection)
+
+    def _body(self, prompt: str, response_format: str, stream: bool) -> bytes:
+        return json.dumps({
+            'prompt': prompt,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'response_format': response_format,
+            'stream': stream
+        }).encode('utf-8')
+
+    def _send(self, prompt: str, response_format: str, stream: bool):
+        body = self._body(prompt, response_format, stream)
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+
+        connection, reused = self._acquire()
+        try:
+            connection.request('POST', self.path, body=body, headers=headers)
+            return connection.getresponse(), connection
+        except _STALE_CONNECTION_ERRORS:
+            connection.close()
+            if not reused:
+                raise
+        # The server closed an idle connection under us; retry once on a fresh one
+        logger.debug("Pooled connection to %s:%s went stale, reconnecting", self.host, self.port)
+        connection = self._new_connection()
+        try:
+            connection.request('POST', self.path, body=body, headers=headers)
+            return connection.getresponse(), connection
+        except BaseException:
+            connection.close()
+            raise
+
+    def _acquire(self):
+        try:
+            connection = self._idle.get_nowait()
+            with self._lock:
+                self._counts['connectionsReused'] += 1
+            return connection, True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self._counts['connectionsOpened'] += 1
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        if response.will_close or self._idle.qsize() >= self.pool_size:
+            connection.close()
+        else:
+            self._idle.put(connection)
+
+
+class _AsyncConnection:
+    """One HTTP/1.1 keep-alive connection on asyncio streams, used by HTTPBackend's async calls.
+
+    Only what the model server protocol needs: POST a JSON body, then read a
+    Content-Length or chunked response whole or line by line.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.status = 0
+        self.headers: Dict[str, str] = {}
+        self.will_close = False
+
+    @classmethod
+    async def open(cls, host: str, port: int, https: bool) -> '_AsyncConnection':
+        reader, writer = await asyncio.open_connection(host, port, ssl=True if https else None)
+        return cls(reader, writer)
+
+    async def request(self, host: str, path: str, body: bytes):
+        """Send a POST and read the status line and headers of its response"""
+        self.writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode('latin-1') + body
+        )
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Model server closed the connection')
+        version, status = status_line.split(None, 2)[:2]
+        self.status = int(status)
+        self.headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            self.headers[name.strip().lower()] = value.strip()
+        self.will_close = version == b'HTTP/1.0' or self.headers.get('connection', '').lower() == 'close'
+
+    async def read(self) -> bytes:
+        return b''.join([data async for data in self._body()])
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        buffer = b''
+        async for data in self._body():
+            *lines, buffer = (buffer + data).split(b'\n')
+            for line in lines:
+                yield line
+        if buffer:
+            yield buffer
+
+    async def _body(self) -> AsyncIterator[bytes]:
+        if self.headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Skip any trailers
+                    while await self.reader.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                yield await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+        elif 'content-length' in self.headers:
+            yield await self.reader.readexactly(int(self.headers['content-length']))
+        else:
+            self.will_close = True
+            yield await self.reader.read()
+
+    def close(self):
+        try:
+            self.writer.close()
+        except RuntimeError:
+            # Its event loop is already closed; the socket goes with the transport
+            pass
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the google-genai SDK (optional dependency)"""
+
+    name = 'gemini'
+
+    def __init__(self, model: str = 'gemini-1.5-pro', **kwargs):
+        super().__init__(**kwargs)
+        try:
+            from google import genai
+            from google.genai import types
+        except ImportError:
+            raise RuntimeError('The gemini backend needs the google-genai package installed')
+        self.client = genai.Client()
+        self.model = model
+        self._types = types
+
+    def _config(self, response_format: str = 'text'):
+        return self._types.GenerateContentConfig(
+            temperature=0.7,
+            max_output_tokens=2048,
+            response_mime_type='application/json' if response_format == 'json' else None
+        )
+
+    def _generate(self, prompt, mock, response_format):
+        response = self.client.models.generate_content(model=self.model, contents=prompt,
+                                                       config=self._config(response_format))
+        return json.loads(response.text) if response_format == 'json' else response.text
+
+    def _stream(self, prompt, mock):
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=prompt,
+                                                                config=self._config()):
+            if chunk.text:
+                yield chunk.text
+
+    async def _agenerate(self, prompt, mock, response_format):
+        response = await self.client.aio.models.generate_content(model=self.model, contents=prompt,
+                                                                 config=self._config(response_format))
+        return json.loads(response.text) if response_format == 'json' else response.text
+
+    async def _astream(self, prompt, mock):
+        async for chunk in await self.client.aio.models.generate_content_stream(model=self.model, contents=prompt,
+                                                                                config=self._config()):
+            if chunk.text:
+                yield chunk.text
+
+
+def build_backend() -> LLMBackend:
+    """Backend selected by SAHAYAK_LLM_BACKEND (mock, http or gemini)"""
+    kind = os.environ.get('SAHAYAK_LLM_BACKEND', 'mock')
+    max_concurrency = int(os.environ.get('SAHAYAK_LLM_CONCURRENCY', '16'))
+    limits = {
+        'max_concurrency': max_concurrency,
+        'timeout': float(os.environ.get('SAHAYAK_LLM_TIMEOUT', '30')),
+        'limiter': _build_limiter(max_concurrency),
+        'breaker': _build_breaker(),
+        'hedger': _build_hedger(max_concurrency)
+    }
+    if kind == 'http':
+        return HTTPBackend(os.environ.get('SAHAYAK_LLM_URL', 'http://127.0.0.1:8088/v1/generate'), **limits)
+    if kind == 'gemini':
+        return GeminiBackend(os.environ.get('SAHAYAK_GEMINI_MODEL', 'gemini-1.5-pro'), **limits)
+    return MockBackend(latency=float(os.environ.get('SAHAYAK_MOCK_LATENCY', '2.0')), **limits)
+
+
+def _build_limiter(max_concurrency: int) -> Optional[AdaptiveLimiter]:
+    """Adaptive limiter from SAHAYAK_LIMIT_* settings, capped at the backend's concurrency"""
+    if os.environ.get('SAHAYAK_LIMIT_ENABLED', '1') == '0':
+        return None
+    return AdaptiveLimiter(
+        initial_limit=float(os.environ.get('SAHAYAK_LIMIT_INITIAL', str(max_concurrency))),
+        max_limit=max_concurrency,
+        tolerance=float(os.environ.get('SAHAYAK_LIMIT_TOLERANCE', '2.0'))
+    )
+
+
+def _build_breaker() -> Optional[CircuitBreaker]:
+    """Circuit breaker from SAHAYAK_BREAKER_* settings"""
+    if os.environ.get('SAHAYAK_BREAKER_ENABLED', '1') == '0':
+        return None
+    return CircuitBreaker(
+        failure_threshold=float(os.environ.get('SAHAYAK_BREAKER_THRESHOLD', '0.5')),
+        min_calls=int(os.environ.get('SAHAYAK_BREAKER_MIN_CALLS', '20')),
+        reset_timeout=float(os.environ.get('SAHAYAK_BREAKER_RESET', '10'))
+    )
+
+
+def _build_hedger(max_concurrency: int) -> Optional[Hedger]:
+    """Request hedging from SAHAYAK_HEDGE_* settings"""
+    if os.environ.get('SAHAYAK_HEDGE_ENABLED', '1') == '0':
+        return None
+    return Hedger(
+        percentile=float(os.environ.get('SAHAYAK_HEDGE_PERCENTILE', '0.95')),
+        budget=float(os.environ.get('SAHAYAK_HEDGE_BUDGET', '0.1')),
+        max_workers=max_concurrency * 2
+    )
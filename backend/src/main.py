@@ -1,33 +1,308 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import click
 import os
 import json
 import time
 import base64
+import binascii
 import random
 import logging
-# from ai_services import ai_service  # Commented out for deployment
+import contextvars
+from functools import wraps
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    import orjson
+except ImportError:
+    # Optional: without it the standard library serializes responses
+    orjson = None
+from ai_services import ai_service
+from response_cache import CACHE_FLAGS
+from concurrency_limiter import OverloadedError, request_priority
+from prompts import prompt_registry
+from job_queue import JobQueue, QueueFullError, InvalidWebhookError
+from ids import id_generator, is_id
+from content_store import ContentStore
+from sqlite_store import SqliteStore, SqliteResponseCache, SqliteJobRecords
+from blob_store import BlobStore, UploadTooLargeError, InvalidUploadError
+from static_assets import StaticAssets
+import metrics
+import tracing
+import http_cache
+from profiler import SamplingProfiler, collapsed
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; every line carries the trace id of the request that logged it
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s [trace=%(trace_id)s] %(message)s')
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(tracing.TraceIdFilter())
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__, static_folder='static', static_url_path='')
+class TracedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with (de)serialization recorded as trace spans.
+
+    When orjson is installed it does the work, straight to bytes: several
+    times faster than the json module on the long markdown strings in
+    generated records. Keys stay sorted and datetimes, Decimals and the
+    like fall back to Flask's own conversions; anything orjson still
+    refuses (integers beyond 64 bits) goes through the json module. Non-ASCII
+    text is sent as UTF-8 rather than \\u escapes. Debug mode keeps Flask's
+    indented output.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or orjson is None:
+            with tracing.span('json.serialize'):
+                return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj) -> bytes:
+        """Compact JSON as UTF-8 bytes, ready to send"""
+        with tracing.span('json.serialize'):
+            if orjson is not None:
+                options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                if self.sort_keys:
+                    options |= orjson.OPT_SORT_KEYS
+                try:
+                    return orjson.dumps(obj, default=self.default, option=options)
+                except TypeError:
+                    pass
+            return super().dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, s, **kwargs):
+        with tracing.span('json.parse'):
+            if orjson is not None and not kwargs:
+                return orjson.loads(s)
+            return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+# No built-in static route: the frontend is served by static_assets below, which
+# also has to fall back to index.html for client-side routes
+app = Flask(__name__, static_folder=None)
+app.json = TracedJSONProvider(app)
 CORS(app)
 
-# Mock database for storing user data and generated content
-mock_database = {
-    'users': {},
-    'content': {},
-    'worksheets': {},
-    'visual_aids': {},
-    'assessments': {},
-    'videos': {}
-}
+class InvalidRequest(ValueError):
+    """Invalid request parameters; reported to the client as a 400"""
+
+@app.errorhandler(OverloadedError)
+def handle_overloaded(e):
+    return jsonify({'error': str(e), 'retryAfter': e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
+
+def prioritized(priority):
+    """Run a view's model calls at the given priority ('high', 'normal' or 'low').
+
+    When the model backend is saturated, calls are shed lowest priority first
+    with a 429 instead of tying up a request thread; endpoints without a
+    priority (health, listings, static files) never wait on the model.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with request_priority(priority):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Metrics (exposed at /metrics in the Prometheus text format)
+HTTP_REQUESTS = metrics.registry.counter(
+    'sahayak_http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status'))
+HTTP_IN_FLIGHT = metrics.registry.gauge(
+    'sahayak_http_requests_in_flight', 'HTTP requests currently being handled', ('route',))
+HTTP_DURATION = metrics.registry.histogram(
+    'sahayak_http_request_duration_seconds', 'Time until the response (or first streamed byte) is ready',
+    ('route', 'method'))
+HTTP_REQUEST_SIZE = metrics.registry.histogram(
+    'sahayak_http_request_size_bytes', 'Request body size', ('route',), metrics.SIZE_BUCKETS)
+HTTP_RESPONSE_SIZE = metrics.registry.histogram(
+    'sahayak_http_response_size_bytes', 'Response body size (streamed responses excluded)', ('route',),
+    metrics.SIZE_BUCKETS)
+AI_DURATION = metrics.registry.histogram(
+    'sahayak_ai_method_duration_seconds', 'AIService method duration, including cache hits', ('method',))
+AI_ERRORS = metrics.registry.counter(
+    'sahayak_ai_method_errors_total', 'AIService method calls that raised', ('method',))
+MODEL_DURATION = metrics.registry.histogram(
+    'sahayak_model_call_duration_seconds', 'Model backend call duration', ('method',))
+MODEL_ERRORS = metrics.registry.counter(
+    'sahayak_model_call_errors_total', 'Model backend calls that raised', ('method',))
+STORE_DURATION = metrics.registry.histogram(
+    'sahayak_store_operation_duration_seconds', 'Record store operation duration', ('operation',))
+BLOB_DURATION = metrics.registry.histogram(
+    'sahayak_blob_operation_duration_seconds', 'Blob store operation duration', ('operation',))
+
+metrics.instrument(ai_service, AI_DURATION, AI_ERRORS, [
+    'generate_educational_content', 'generate_worksheet', 'generate_visual_aid',
+    'stream_educational_content', 'stream_worksheet', 'stream_visual_aid',
+    'agenerate_educational_content', 'agenerate_worksheet', 'agenerate_visual_aid',
+    'astream_educational_content', 'astream_worksheet', 'astream_visual_aid',
+    'analyze_voice_assessment', 'analyze_image'
+])
+metrics.instrument(ai_service.backend, MODEL_DURATION, MODEL_ERRORS, ['generate', 'stream', 'agenerate', 'astream'])
+
+# Tracing: every request gets a trace id (X-Trace-Id, also accepted from the
+# caller) and a Server-Timing breakdown of its spans
+tracing.instrument(ai_service, 'ai', [
+    'generate_educational_content', 'generate_worksheet', 'generate_visual_aid',
+    'stream_educational_content', 'stream_worksheet', 'stream_visual_aid',
+    'agenerate_educational_content', 'agenerate_worksheet', 'agenerate_visual_aid',
+    'astream_educational_content', 'astream_worksheet', 'astream_visual_aid',
+    'analyze_voice_assessment', 'analyze_image'
+])
+tracing.instrument(prompt_registry, 'prompt', ['fingerprint'])
+
+def _build_profiler():
+    """Sampling profiler for requests slower than SAHAYAK_PROFILE_THRESHOLD_MS (off when unset)"""
+    threshold = os.environ.get('SAHAYAK_PROFILE_THRESHOLD_MS')
+    if not threshold:
+        return None
+    return SamplingProfiler(
+        threshold=float(threshold) / 1000,
+        interval=float(os.environ.get('SAHAYAK_PROFILE_INTERVAL_MS', '5')) / 1000
+    )
+
+profiler = _build_profiler()
+
+@app.before_request
+def _start_trace():
+    tracing.start_trace(tracing.trace_id_from_headers(request.headers))
+    if profiler:
+        profiler.begin()
+
+@app.after_request
+def _add_trace_headers(response):
+    trace = tracing.current_trace()
+    if trace is not None:
+        response.headers['X-Trace-Id'] = trace.id
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def _end_trace(exc):
+    trace = tracing.current_trace()
+    if trace is None:
+        return
+    if profiler:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        profiler.end(trace, trace.elapsed(), route=route, method=request.method, path=request.path)
+    tracing.end_trace()
+
+@app.before_request
+def _start_request_metrics():
+    # One g attribute and raw environ reads keep this off the profile of cheap endpoints
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    g.metrics = (route, time.perf_counter())
+    HTTP_IN_FLIGHT.inc(route)
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get('metrics')
+    if started is not None:
+        route, started_at = started
+        environ = request.environ
+        HTTP_DURATION.observe(time.perf_counter() - started_at, route, environ['REQUEST_METHOD'])
+        HTTP_REQUESTS.inc(route, environ['REQUEST_METHOD'], str(response.status_code))
+        HTTP_REQUEST_SIZE.observe(int(environ.get('CONTENT_LENGTH') or 0), route)
+        if not response.is_streamed:
+            HTTP_RESPONSE_SIZE.observe(int(response.headers.get('Content-Length', 0)), route)
+    return response
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    started = g.get('metrics')
+    if started is not None:
+        HTTP_IN_FLIGHT.dec(started[0])
+
+# JSON responses of at least this many bytes are gzip (or brotli) compressed for clients that accept it
+COMPRESS_MIN_BYTES = int(os.environ.get('SAHAYAK_COMPRESS_MIN_BYTES', '1024'))
+
+@app.after_request
+def _compress_json(response):
+    # Registered after _record_request_metrics so it runs first and response sizes are what is sent
+    return http_cache.compress_response(response, COMPRESS_MIN_BYTES)
+
+# Set by serve.py (or any pre-forking server): state that must agree across
+# worker processes lives in the SQLite database instead of process memory
+SHARED_STATE = os.environ.get('SAHAYAK_SHARED_STATE', '0') == '1'
+
+def _build_store():
+    """SQLite (WAL) by default; SAHAYAK_STORE=memory keeps everything in-process"""
+    if os.environ.get('SAHAYAK_STORE', 'sqlite') == 'memory':
+        if SHARED_STATE:
+            raise RuntimeError('SAHAYAK_SHARED_STATE needs SAHAYAK_STORE=sqlite; a memory store is per process')
+        return ContentStore()
+    return SqliteStore(
+        os.environ.get('SAHAYAK_DB_PATH', os.path.join(os.path.dirname(__file__), 'database', 'sahayak.db')),
+        pool_size=int(os.environ.get('SAHAYAK_DB_POOL_SIZE', '5'))
+    )
+
+# Store for user data and generated content, indexed per user
+store = _build_store()
+
+if SHARED_STATE and ai_service.cache is not None:
+    # One cache for all workers, so a generation cached by one is a hit on every other
+    ai_service.cache = SqliteResponseCache(store.engine, max_entries=ai_service.cache.max_entries,
+                                           ttl=ai_service.cache.ttl)
+if ai_service.cache:
+    tracing.instrument(ai_service.cache, 'cache', ['get', 'get_stale', 'set'])
+
+# Media uploads are streamed into a content-addressed blob store; records only keep a reference
+blob_store = BlobStore(
+    os.environ.get('SAHAYAK_UPLOAD_DIR', os.path.join(os.path.dirname(__file__), 'database', 'uploads')),
+    max_bytes=int(os.environ.get('SAHAYAK_MAX_UPLOAD_MB', '512')) * 1024 * 1024
+)
+
+metrics.instrument(store, STORE_DURATION, None, [
+    'get_user', 'save_user', 'insert', 'insert_many', 'get', 'get_json', 'delete', 'list_user',
+    'count_user', 'user_stats'
+])
+metrics.instrument(blob_store, BLOB_DURATION, None, ['save_stream', 'save_base64', 'incref', 'decref', 'info'])
+tracing.instrument(store, 'store', [
+    'get_user', 'save_user', 'insert', 'insert_many', 'get', 'get_json', 'delete', 'list_user',
+    'count_user', 'user_stats'
+])
+tracing.instrument(blob_store, 'blobs', ['save_stream', 'save_base64', 'incref', 'decref', 'info'])
+
+def _resolve_media(data, upload_key, legacy_key):
+    """Reference to the media for a request: an uploadId, or an inline base64 payload saved to disk"""
+    upload_id = data.get(upload_key)
+    if upload_id:
+        info = blob_store.info(upload_id)
+        if info is None:
+            raise InvalidRequest(f"Unknown {upload_key}: {upload_id}")
+        return {key: info[key] for key in ('uploadId', 'size', 'contentType')}
+    if data.get(legacy_key):
+        try:
+            reference = blob_store.save_base64(data[legacy_key])
+        except InvalidUploadError as e:
+            raise InvalidRequest(f"Invalid {legacy_key}: {e}")
+        return {key: reference[key] for key in ('uploadId', 'size', 'contentType')}
+    return None
+
+def _media_view(media):
+    """Memory-mapped view of the media bytes (or None) for handing to AIService"""
+    return blob_store.view(media['uploadId']) if media else nullcontext(None)
+
+def _attach_media(media):
+    """Count a stored record's reference to its media so gc keeps the blob"""
+    if media:
+        blob_store.incref(media['uploadId'])
+
+def delete_record(collection, record_id):
+    """Delete a stored record and drop its media reference, so gc can reclaim the blob"""
+    record = store.delete(collection, record_id)
+    if record is not None and record.get('media'):
+        blob_store.decref(record['media']['uploadId'])
+    return record
 
 def generate_id():
-    """Generate a unique ID"""
-    return f"id_{int(time.time())}_{hash(str(time.time())) % 10000}"
+    """Generate a unique, time-sortable ID"""
+    return id_generator.next_id()
 
 # Authentication endpoints
 @app.route('/api/auth/register', methods=['POST'])
@@ -42,7 +317,7 @@ def register():
             return jsonify({'error': 'Email and password required'}), 400
         
         # Check if user already exists
-        if email in mock_database['users']:
+        if store.get_user(email) is not None:
             return jsonify({'error': 'User already exists'}), 400
         
         # Create new user
@@ -60,7 +335,7 @@ def register():
             }
         }
         
-        mock_database['users'][email] = user
+        store.save_user(user)
         
         return jsonify({
             'success': True,
@@ -82,9 +357,10 @@ def login():
             return jsonify({'error': 'Email and password required'}), 400
         
         # Mock authentication - in production, verify password
-        if email in mock_database['users']:
-            user = mock_database['users'][email]
+        user = store.get_user(email)
+        if user is not None:
             user['lastLoginAt'] = time.time()
+            store.save_user(user)
             return jsonify({
                 'success': True,
                 'user': user,
@@ -106,7 +382,7 @@ def login():
                     'grades': ['Grade 3', 'Grade 4', 'Grade 5']
                 }
             }
-            mock_database['users'][email] = user
+            store.save_user(user)
             
             return jsonify({
                 'success': True,
@@ -124,204 +400,199 @@ def logout():
         'message': 'Logout successful'
     })
 
-# Content generation endpoints
-@app.route('/api/generate-content', methods=['POST'])
-def generate_content():
-    try:
-        data = request.json
-        user_id = data.get('userId', 'demo-user')
-        
-        result = ai_service.generate_educational_content(
-            subject=data['subject'],
-            grade=data['grade'],
-            language=data['language'],
-            topic=data['topic'],
-            content_type=data['contentType']
-        )
-        
-        if result['success']:
-            # Save to mock database
-            content_id = generate_id()
-            content_record = {
-                'id': content_id,
-                'userId': user_id,
-                'content': result['content'],
-                'metadata': result['metadata'],
-                'createdAt': time.time()
-            }
-            mock_database['content'][content_id] = content_record
-            
-            return jsonify({
-                'success': True,
-                'content': result['content'],
-                'contentId': content_id,
-                'metadata': result['metadata']
-            })
-        else:
-            return jsonify(result), 500
-            
-    except Exception as e:
-        logger.error(f"Content generation error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+# Content generation
+# Each _run_* function does the work behind one endpoint and returns
+# (response_body, http_status) so it can run either inside the request
+# or on a job queue worker. The parameter and save helpers are shared with
+# the async handlers in asgi.py.
+def _cache_flags(result):
+    # Reported to the caller only; the saved record's metadata describes the generation itself
+    return {flag: True for flag in CACHE_FLAGS if result.get(flag)}
 
-@app.route('/api/generate-worksheet', methods=['POST'])
-def generate_worksheet():
-    try:
-        data = request.json
-        user_id = data.get('userId', 'demo-user')
-        
-        result = ai_service.generate_worksheet(
-            subject=data['subject'],
-            grade=data['grade'],
-            language=data['language'],
-            topic=data['topic'],
-            difficulty=data['difficulty'],
-            student_level=data['studentLevel']
-        )
-        
-        if result['success']:
-            # Save to mock database
-            worksheet_id = generate_id()
-            worksheet_record = {
-                'id': worksheet_id,
-                'userId': user_id,
-                'worksheet': result['worksheet'],
-                'metadata': result['metadata'],
-                'createdAt': time.time()
-            }
-            mock_database['worksheets'][worksheet_id] = worksheet_record
-            
-            return jsonify({
-                'success': True,
-                'worksheet': result['worksheet'],
-                'worksheetId': worksheet_id,
-                'metadata': result['metadata']
-            })
-        else:
-            return jsonify(result), 500
-            
-    except Exception as e:
-        logger.error(f"Worksheet generation error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+def _run_generate_content(data):
+    result = ai_service.generate_educational_content(
+        **_content_params(data),
+        use_cache=not data.get('bypassCache', False)
+    )
+    return _save_content(data, result)
 
-@app.route('/api/generate-visual-aid', methods=['POST'])
-def generate_visual_aid():
-    try:
-        data = request.json
-        user_id = data.get('userId', 'demo-user')
-        
-        result = ai_service.generate_visual_aid(
-            subject=data['subject'],
-            grade=data['grade'],
-            language=data['language'],
-            topic=data['topic'],
-            aid_type=data['aidType']
-        )
-        
-        if result['success']:
-            # Save to mock database
-            aid_id = generate_id()
-            aid_record = {
-                'id': aid_id,
-                'userId': user_id,
-                'description': result['description'],
-                'metadata': result['metadata'],
-                'createdAt': time.time()
-            }
-            mock_database['visual_aids'][aid_id] = aid_record
-            
-            return jsonify({
-                'success': True,
-                'description': result['description'],
-                'aidId': aid_id,
-                'metadata': result['metadata']
-            })
-        else:
-            return jsonify(result), 500
-            
-    except Exception as e:
-        logger.error(f"Visual aid generation error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+def _content_params(data):
+    return {
+        'subject': data['subject'],
+        'grade': data['grade'],
+        'language': data['language'],
+        'topic': data['topic'],
+        'content_type': data['contentType']
+    }
 
-@app.route('/api/process-voice-assessment', methods=['POST'])
-def process_voice_assessment():
-    try:
-        data = request.json
-        user_id = data.get('userId', 'demo-user')
-        
+def _save_content(data, result):
+    if not result['success']:
+        return result, 500
+    
+    # Save to store
+    content_id = generate_id()
+    content_record = {
+        'id': content_id,
+        'userId': data.get('userId', 'demo-user'),
+        'content': result['content'],
+        'metadata': result['metadata'],
+        'createdAt': time.time()
+    }
+    store.insert('content', content_record)
+    
+    return {
+        'success': True,
+        'content': result['content'],
+        'contentId': content_id,
+        'metadata': result['metadata'],
+        **_cache_flags(result)
+    }, 200
+
+def _run_generate_worksheet(data):
+    result = ai_service.generate_worksheet(
+        **_worksheet_params(data),
+        use_cache=not data.get('bypassCache', False)
+    )
+    return _save_worksheet(data, result)
+
+def _worksheet_params(data):
+    return {
+        'subject': data['subject'],
+        'grade': data['grade'],
+        'language': data['language'],
+        'topic': data['topic'],
+        'difficulty': data['difficulty'],
+        'student_level': data['studentLevel']
+    }
+
+def _save_worksheet(data, result):
+    if not result['success']:
+        return result, 500
+    
+    # Save to store
+    worksheet_id = generate_id()
+    worksheet_record = {
+        'id': worksheet_id,
+        'userId': data.get('userId', 'demo-user'),
+        'worksheet': result['worksheet'],
+        'metadata': result['metadata'],
+        'createdAt': time.time()
+    }
+    store.insert('worksheets', worksheet_record)
+    
+    return {
+        'success': True,
+        'worksheet': result['worksheet'],
+        'worksheetId': worksheet_id,
+        'metadata': result['metadata'],
+        **_cache_flags(result)
+    }, 200
+
+def _run_generate_visual_aid(data):
+    result = ai_service.generate_visual_aid(
+        **_visual_aid_params(data),
+        use_cache=not data.get('bypassCache', False)
+    )
+    return _save_visual_aid(data, result)
+
+def _visual_aid_params(data):
+    return {
+        'subject': data['subject'],
+        'grade': data['grade'],
+        'language': data['language'],
+        'topic': data['topic'],
+        'aid_type': data['aidType']
+    }
+
+def _save_visual_aid(data, result):
+    if not result['success']:
+        return result, 500
+    
+    # Save to store
+    aid_id = generate_id()
+    aid_record = {
+        'id': aid_id,
+        'userId': data.get('userId', 'demo-user'),
+        'description': result['description'],
+        'metadata': result['metadata'],
+        'createdAt': time.time()
+    }
+    store.insert('visual_aids', aid_record)
+    
+    return {
+        'success': True,
+        'description': result['description'],
+        'aidId': aid_id,
+        'metadata': result['metadata'],
+        **_cache_flags(result)
+    }, 200
+
+def _run_voice_assessment(data):
+    user_id = data.get('userId', 'demo-user')
+    audio = _resolve_media(data, 'audioUploadId', 'audioData')
+    
+    with _media_view(audio) as audio_bytes:
         result = ai_service.analyze_voice_assessment(
             subject=data['subject'],
             grade=data['grade'],
             language=data['language'],
             question=data['question'],
-            audio_data=data.get('audioData')
+            audio=audio_bytes
         )
-        
-        if result['success']:
-            # Save to mock database
-            assessment_id = generate_id()
-            assessment_record = {
-                'id': assessment_id,
-                'userId': user_id,
-                'analysis': result['analysis'],
-                'metadata': result['metadata'],
-                'createdAt': time.time()
-            }
-            mock_database['assessments'][assessment_id] = assessment_record
-            
-            return jsonify({
-                'success': True,
-                'analysis': result['analysis'],
-                'assessmentId': assessment_id,
-                'metadata': result['metadata']
-            })
-        else:
-            return jsonify(result), 500
-            
-    except Exception as e:
-        logger.error(f"Voice assessment error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    
+    if not result['success']:
+        return result, 500
+    
+    # Save to store
+    assessment_id = generate_id()
+    assessment_record = {
+        'id': assessment_id,
+        'userId': user_id,
+        'analysis': result['analysis'],
+        'metadata': result['metadata'],
+        'media': audio,
+        'createdAt': time.time()
+    }
+    store.insert('assessments', assessment_record)
+    _attach_media(audio)
+    
+    return {
+        'success': True,
+        'analysis': result['analysis'],
+        'assessmentId': assessment_id,
+        'metadata': result['metadata']
+    }, 200
 
-@app.route('/api/analyze-image', methods=['POST'])
-def analyze_image():
-    try:
-        data = request.json
-        user_id = data.get('userId', 'demo-user')
-        
+def _run_analyze_image(data):
+    image = _resolve_media(data, 'imageUploadId', 'imageData')
+    
+    with _media_view(image) as image_bytes:
         result = ai_service.analyze_image(
             subject=data['subject'],
             grade=data['grade'],
             language=data['language'],
-            image_data=data.get('imageData')
+            image=image_bytes
         )
-        
-        if result['success']:
-            return jsonify({
-                'success': True,
-                'analysis': result['analysis'],
-                'metadata': result['metadata']
-            })
-        else:
-            return jsonify(result), 500
-            
-    except Exception as e:
-        logger.error(f"Image analysis error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    
+    if not result['success']:
+        return result, 500
+    
+    return {
+        'success': True,
+        'analysis': result['analysis'],
+        'metadata': result['metadata']
+    }, 200
 
-# Video recording and processing
-@app.route('/api/process-video', methods=['POST'])
-def process_video():
-    try:
-        data = request.json
-        user_id = data.get('userId', 'demo-user')
-        language = data.get('language', 'English')
-        video_data = data.get('videoData')
-        
-        # Mock video processing
-        time.sleep(3)  # Simulate processing time
-        
-        video_id = generate_id()
-        processed_content = f"""# Video Content Analysis
+def _run_process_video(data):
+    user_id = data.get('userId', 'demo-user')
+    language = data.get('language', 'English')
+    video = _resolve_media(data, 'videoUploadId', 'videoData')
+    
+    # Mock video processing
+    time.sleep(3)  # Simulate processing time
+    
+    video_id = generate_id()
+    processed_content = f"""# Video Content Analysis
 
 ## Language: {language}
 ## Processed at: {time.strftime('%Y-%m-%d %H:%M:%S')}
@@ -353,79 +624,489 @@ The video contains educational content that can be used for teaching purposes. T
 - Plan follow-up activities
 - Share with other teachers
 """
+    
+    video_record = {
+        'id': video_id,
+        'userId': user_id,
+        'language': language,
+        'processedContent': processed_content,
+        'media': video,
+        'createdAt': time.time()
+    }
+    store.insert('videos', video_record)
+    _attach_media(video)
+    
+    return {
+        'success': True,
+        'videoId': video_id,
+        'processedContent': processed_content,
+        'message': 'Video processed successfully'
+    }, 200
+
+@app.route('/api/generate-content', methods=['POST'])
+@prioritized('normal')
+def generate_content():
+    try:
+        body, status = _run_generate_content(request.json)
+        return jsonify(body), status
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Content generation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/generate-worksheet', methods=['POST'])
+@prioritized('normal')
+def generate_worksheet():
+    try:
+        body, status = _run_generate_worksheet(request.json)
+        return jsonify(body), status
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Worksheet generation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/generate-visual-aid', methods=['POST'])
+@prioritized('normal')
+def generate_visual_aid():
+    try:
+        body, status = _run_generate_visual_aid(request.json)
+        return jsonify(body), status
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Visual aid generation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/process-voice-assessment', methods=['POST'])
+def process_voice_assessment():
+    try:
+        body, status = _run_voice_assessment(request.json)
+        return jsonify(body), status
+    except InvalidRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Voice assessment error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analyze-image', methods=['POST'])
+@prioritized('normal')
+def analyze_image():
+    try:
+        body, status = _run_analyze_image(request.json)
+        return jsonify(body), status
+    except InvalidRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Image analysis error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Video recording and processing
+@app.route('/api/process-video', methods=['POST'])
+def process_video():
+    try:
+        body, status = _run_process_video(request.json)
+        return jsonify(body), status
+    except InvalidRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Video processing error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Media uploads: multipart (field "file") or a raw request body, streamed to disk
+@app.route('/api/uploads', methods=['POST'])
+def upload_media():
+    try:
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+        field = 'file' if upload is not None else 'request body'
+        if upload is not None:
+            reference = blob_store.save_stream(upload.stream, upload.mimetype)
+        else:
+            reference = blob_store.save_stream(request.stream, request.mimetype)
         
-        video_record = {
-            'id': video_id,
+        return jsonify({
+            'success': True,
+            **reference
+        }), 201
+    except InvalidUploadError as e:
+        return jsonify({'error': f"Invalid {field}: {e}"}), 400
+    except UploadTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        logger.error(f"Upload error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    info = blob_store.info(upload_id)
+    if info is None or not blob_store.exists(upload_id):
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    # Blobs are immutable and named by their hash; send_file hands the file to
+    # the server's file wrapper (sendfile) rather than copying it through Python
+    response = send_file(blob_store.path(upload_id), mimetype=info['contentType'],
+                         etag=upload_id, conditional=True, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# Streaming generation (Server-Sent Events)
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def _stream_record(collection, field, id_key, user_id, stream):
+    """Relay a text stream as SSE chunk events, then persist the assembled record"""
+    parts = []
+    try:
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as stop:
+                metadata = stop.value
+                break
+            parts.append(chunk)
+            yield _sse('chunk', {'text': chunk})
+        
+        record_id = generate_id()
+        store.insert(collection, {
+            'id': record_id,
             'userId': user_id,
-            'language': language,
-            'processedContent': processed_content,
-            'originalData': video_data,
+            field: ''.join(parts),
+            'metadata': metadata,
             'createdAt': time.time()
-        }
-        mock_database['videos'][video_id] = video_record
+        })
+        yield _sse('done', {'success': True, id_key: record_id, 'metadata': metadata})
+    except Exception as e:
+        logger.error(f"Streaming {collection} error: {str(e)}")
+        yield _sse('error', {'error': str(e)})
+
+def _start_stream(stream):
+    """Pull the first chunk inside the request, so a shed call is still a plain 429"""
+    try:
+        first = next(stream)
+    except StopIteration as stop:
+        metadata = stop.value
+        def empty():
+            return metadata
+            yield
+        return empty()
+    def relay():
+        yield first
+        return (yield from stream)
+    return relay()
+
+def _sse_response(events):
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/generate-content/stream', methods=['POST'])
+@prioritized('high')
+def stream_content():
+    try:
+        data = request.json
+        stream = ai_service.stream_educational_content(**_content_params(data))
+        return _sse_response(_stream_record(
+            'content', 'content', 'contentId', data.get('userId', 'demo-user'), _start_stream(stream)
+        ))
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Content streaming error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/generate-worksheet/stream', methods=['POST'])
+@prioritized('high')
+def stream_worksheet():
+    try:
+        data = request.json
+        stream = ai_service.stream_worksheet(**_worksheet_params(data))
+        return _sse_response(_stream_record(
+            'worksheets', 'worksheet', 'worksheetId', data.get('userId', 'demo-user'), _start_stream(stream)
+        ))
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Worksheet streaming error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/generate-visual-aid/stream', methods=['POST'])
+@prioritized('high')
+def stream_visual_aid():
+    try:
+        data = request.json
+        stream = ai_service.stream_visual_aid(**_visual_aid_params(data))
+        return _sse_response(_stream_record(
+            'visual_aids', 'description', 'aidId', data.get('userId', 'demo-user'), _start_stream(stream)
+        ))
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Visual aid streaming error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Batch generation: several worksheet variants fanned out concurrently
+MAX_BATCH_ITEMS = 50
+BATCH_CONCURRENCY = int(os.environ.get('SAHAYAK_BATCH_CONCURRENCY', '4'))
+
+def _run_batch_item(index, params):
+    try:
+        if not isinstance(params, dict):
+            raise InvalidRequest('Item must be an object')
+        body, status = _run_generate_worksheet(params)
+    except InvalidRequest as e:
+        body, status = {'error': str(e)}, 400
+    except KeyError as e:
+        body, status = {'error': f"Missing field: {e.args[0]}"}, 400
+    except OverloadedError as e:
+        body, status = {'error': str(e), 'retryAfter': e.retry_after}, 429
+    except Exception as e:
+        logger.error(f"Batch worksheet item {index} error: {str(e)}")
+        body, status = {'error': str(e)}, 500
+    return {'index': index, 'status': status, **body}
+
+@app.route('/api/generate-worksheet/batch', methods=['POST'])
+@prioritized('low')
+def generate_worksheet_batch():
+    try:
+        data = request.json
+        items = data.get('items') or []
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f"At most {MAX_BATCH_ITEMS} items per batch"}), 400
+        
+        # Top-level fields (userId, subject, ...) are defaults for every item
+        defaults = {key: value for key, value in data.items() if key not in ('items', 'stream')}
+        params = [{**defaults, **item} if isinstance(item, dict) else item for item in items]
+        executor = ThreadPoolExecutor(max_workers=min(BATCH_CONCURRENCY, len(params)))
+        # Each item runs in a copy of this request's context, so it keeps the batch's low priority
+        futures = [executor.submit(contextvars.copy_context().run, _run_batch_item, index, item)
+                   for index, item in enumerate(params)]
+        executor.shutdown(wait=False)
         
+        if data.get('stream'):
+            # Emit each item as soon as it finishes
+            def events():
+                for future in as_completed(futures):
+                    yield _sse('item', future.result())
+                yield _sse('done', {'success': True, 'count': len(futures)})
+            return _sse_response(events())
+        
+        results = [future.result() for future in futures]
         return jsonify({
-            'success': True,
-            'videoId': video_id,
-            'processedContent': processed_content,
-            'message': 'Video processed successfully'
+            'success': all(result['status'] < 400 for result in results),
+            'results': results
         })
+    except Exception as e:
+        logger.error(f"Batch worksheet generation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Background jobs: submit any generation request and poll for the result
+job_queue = JobQueue(
+    workers=int(os.environ.get('SAHAYAK_JOB_WORKERS', '8')),
+    max_pending=int(os.environ.get('SAHAYAK_JOB_QUEUE_SIZE', '1000')),
+    records=SqliteJobRecords(store.engine) if SHARED_STATE else None,
+    # Comma-separated; when set, webhooks may only call these hosts (internal ones included)
+    webhook_hosts=[host.strip() for host in os.environ.get('SAHAYAK_WEBHOOK_HOSTS', '').split(',') if host.strip()]
+)
+job_queue.register('generate-content', _run_generate_content)
+job_queue.register('generate-worksheet', _run_generate_worksheet)
+job_queue.register('generate-visual-aid', _run_generate_visual_aid)
+job_queue.register('process-voice-assessment', _run_voice_assessment)
+job_queue.register('analyze-image', _run_analyze_image)
+job_queue.register('process-video', _run_process_video)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    try:
+        data = request.json
+        job_type = data.get('type')
+        
+        if job_type not in job_queue.job_types:
+            return jsonify({
+                'error': f"Unknown job type: {job_type}",
+                'jobTypes': job_queue.job_types
+            }), 400
         
+        job = job_queue.submit(job_type, data.get('params') or {}, data.get('webhookUrl'))
+        
+        return jsonify({
+            'success': True,
+            'jobId': job['id'],
+            'status': job['status'],
+            'statusUrl': f"/api/jobs/{job['id']}"
+        }), 202
+    except InvalidWebhookError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
     except Exception as e:
-        logger.error(f"Video processing error: {str(e)}")
+        logger.error(f"Job submission error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/stats', methods=['GET'])
+def get_job_stats():
+    return jsonify({
+        'success': True,
+        'stats': job_queue.stats()
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 # Data retrieval endpoints
+MAX_PAGE_SIZE = 200
+
+def _encode_cursor(record):
+    """Opaque cursor pointing just past the given record (ids sort by creation time)"""
+    return base64.urlsafe_b64encode(record['id'].encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    try:
+        record_id = base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('ascii')
+    except (ValueError, binascii.Error):
+        raise InvalidRequest('Invalid cursor')
+    if not is_id(record_id):
+        raise InvalidRequest('Invalid cursor')
+    return record_id
+
+def _project(record, fields):
+    """Keep only the requested top-level fields (the id is always kept)"""
+    if not fields:
+        return record
+    return {key: record[key] for key in fields if key in record}
+
+def _parse_fields():
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return ['id'] + [field.strip() for field in fields.split(',') if field.strip() and field.strip() != 'id']
+
+def _list_user_records(collection, user_id, content_type=None):
+    """One page of a user's records, newest first, driven by limit/after/fields query args"""
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    fields = _parse_fields()
+    
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise InvalidRequest('limit must be an integer')
+        if limit < 1:
+            raise InvalidRequest('limit must be positive')
+        limit = min(limit, MAX_PAGE_SIZE)
+    
+    # Fetch one extra record to know whether another page exists
+    records = store.list_user(
+        collection, user_id,
+        content_type=content_type,
+        limit=None if limit is None else limit + 1,
+        after=_decode_cursor(after) if after else None
+    )
+    
+    next_cursor = None
+    if limit is not None and len(records) > limit:
+        records = records[:limit]
+        next_cursor = _encode_cursor(records[-1])
+    
+    return [_project(record, fields) for record in records], next_cursor
+
 @app.route('/api/user/<user_id>/content', methods=['GET'])
+@http_cache.conditional
 def get_user_content(user_id):
     try:
         content_type = request.args.get('type')
-        user_content = []
         
-        for content in mock_database['content'].values():
-            if content['userId'] == user_id:
-                if not content_type or content['metadata'].get('content_type') == content_type:
-                    user_content.append(content)
-        
-        # Sort by creation time (newest first)
-        user_content.sort(key=lambda x: x['createdAt'], reverse=True)
+        # Newest first, straight from the per-user index
+        user_content, next_cursor = _list_user_records('content', user_id, content_type=content_type)
         
         return jsonify({
             'success': True,
-            'content': user_content
+            'content': user_content,
+            'nextCursor': next_cursor
         })
+    except InvalidRequest as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error retrieving user content: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/user/<user_id>/worksheets', methods=['GET'])
+@http_cache.conditional
 def get_user_worksheets(user_id):
     try:
-        user_worksheets = []
-        
-        for worksheet in mock_database['worksheets'].values():
-            if worksheet['userId'] == user_id:
-                user_worksheets.append(worksheet)
-        
-        user_worksheets.sort(key=lambda x: x['createdAt'], reverse=True)
+        user_worksheets, next_cursor = _list_user_records('worksheets', user_id)
         
         return jsonify({
             'success': True,
-            'worksheets': user_worksheets
+            'worksheets': user_worksheets,
+            'nextCursor': next_cursor
         })
+    except InvalidRequest as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error retrieving user worksheets: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _record_response(collection, record_id, key, missing):
+    """One stored record as {"success": true, key: record}, projected by the fields query arg"""
+    fields = _parse_fields()
+    if fields:
+        record = store.get(collection, record_id)
+        if record is None:
+            return jsonify({'error': missing}), 404
+        return jsonify({'success': True, key: _project(record, fields)})
+
+    # Records don't change once stored, so their JSON is kept and spliced in as is. Stores
+    # encode it like app.json (sorted, compact) and the keys below are in sorted order, so
+    # this matches jsonify byte for byte (rows written before that keep the json module's
+    # spacing, which parses the same)
+    data = store.get_json(collection, record_id)
+    if data is None:
+        return jsonify({'error': missing}), 404
+    record = b'"%s":%s' % (key.encode('ascii'), data)
+    fields = (record, b'"success":true') if key < 'success' else (b'"success":true', record)
+    return app.response_class(b'{%s}\n' % b','.join(fields), mimetype=app.json.mimetype)
+
+@app.route('/api/content/<content_id>', methods=['GET'])
+@http_cache.conditional
+def get_content(content_id):
+    return _record_response('content', content_id, 'content', 'Content not found')
+
+@app.route('/api/worksheets/<worksheet_id>', methods=['GET'])
+@http_cache.conditional
+def get_worksheet(worksheet_id):
+    return _record_response('worksheets', worksheet_id, 'worksheet', 'Worksheet not found')
+
 @app.route('/api/user/<user_id>/stats', methods=['GET'])
+@http_cache.conditional
 def get_user_stats(user_id):
     try:
+        # Counters are maintained on every insert/delete, so this is a lookup
+        counters = store.user_stats(user_id)
+        collections = counters['collections']
         stats = {
-            'totalContent': len([c for c in mock_database['content'].values() if c['userId'] == user_id]),
-            'totalWorksheets': len([w for w in mock_database['worksheets'].values() if w['userId'] == user_id]),
-            'totalVisualAids': len([v for v in mock_database['visual_aids'].values() if v['userId'] == user_id]),
-            'totalAssessments': len([a for a in mock_database['assessments'].values() if a['userId'] == user_id]),
-            'totalVideos': len([v for v in mock_database['videos'].values() if v['userId'] == user_id])
+            'totalContent': collections.get('content', 0),
+            'totalWorksheets': collections.get('worksheets', 0),
+            'totalVisualAids': collections.get('visual_aids', 0),
+            'totalAssessments': collections.get('assessments', 0),
+            'totalVideos': collections.get('videos', 0),
+            'bySubject': counters['subjects'],
+            'byContentType': counters['contentTypes']
         }
         
         return jsonify({
@@ -436,6 +1117,96 @@ def get_user_stats(user_id):
         logger.error(f"Error retrieving user stats: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        'success': True,
+        'stats': ai_service.cache.stats() if ai_service.cache else None,
+        'inFlight': ai_service.flight.stats() if ai_service.flight else None,
+        'backend': ai_service.backend.stats(),
+        'prompts': prompt_registry.describe()
+    })
+
+@metrics.registry.collector
+def _component_metrics():
+    """Cache, coalescing, model backend, job queue and blob store state, read at scrape time"""
+    if ai_service.cache:
+        cache = ai_service.cache.stats()
+        for key in ('hits', 'misses', 'expirations', 'evictions', 'bypasses', 'staleServed'):
+            yield 'sahayak_cache_events_total', 'counter', 'Response cache events', {'event': key}, cache[key]
+        yield 'sahayak_cache_entries', 'gauge', 'Response cache entries', {}, cache['entries']
+        yield 'sahayak_cache_hit_ratio', 'gauge', 'Response cache hits / lookups', {}, cache['hitRatio']
+    if ai_service.flight:
+        flight = ai_service.flight.stats()
+        yield 'sahayak_singleflight_executions_total', 'counter', 'Upstream calls made', {}, flight['executions']
+        yield 'sahayak_singleflight_coalesced_total', 'counter', 'Calls that shared another call', {}, flight['coalesced']
+        yield 'sahayak_singleflight_inflight', 'gauge', 'Distinct upstream calls in flight', {}, flight['inFlight']
+        # Summed over keys: a label per key (prompt fingerprint) would be unbounded
+        yield 'sahayak_singleflight_waiters', 'gauge', 'Callers waiting on an in-flight call', {}, sum(flight['waiters'].values())
+        yield 'sahayak_singleflight_max_waiters', 'gauge', 'Most callers ever waiting on one call', {}, flight['maxWaiters']
+    
+    backend = ai_service.backend.stats()
+    labels = {'backend': backend['backend']}
+    yield 'sahayak_model_requests_total', 'counter', 'Model backend calls', labels, backend['requests']
+    yield 'sahayak_model_in_flight', 'gauge', 'Model backend calls in flight', labels, backend['inFlight']
+    yield 'sahayak_model_busy_rejections_total', 'counter', 'Calls that timed out waiting for a slot', labels, backend['busyRejections']
+    for key in ('connectionsOpened', 'connectionsReused'):
+        if key in backend:
+            yield 'sahayak_model_connections_total', 'counter', 'Model server connections', {**labels, 'event': key}, backend[key]
+    limiter = backend['limiter']
+    if limiter:
+        yield 'sahayak_limiter_limit', 'gauge', 'Adaptive concurrency limit', {}, limiter['limit']
+        for priority, count in limiter['rejectedByPriority'].items():
+            yield 'sahayak_limiter_rejected_total', 'counter', 'Calls shed with a 429', {'priority': priority}, count
+    breaker = backend['circuitBreaker']
+    if breaker:
+        for state in ('closed', 'open', 'half_open'):
+            yield 'sahayak_circuit_breaker_state', 'gauge', 'Circuit breaker state (1 = current)', {'state': state}, int(breaker['state'] == state)
+        yield 'sahayak_circuit_breaker_opened_total', 'counter', 'Times the breaker opened', {}, breaker['opened']
+        yield 'sahayak_circuit_breaker_short_circuited_total', 'counter', 'Calls refused while open', {}, breaker['shortCircuited']
+    hedging = backend['hedging']
+    if hedging:
+        for key in ('hedgesFired', 'hedgesWon'):
+            yield 'sahayak_hedges_total', 'counter', 'Hedged model calls', {'event': key}, hedging[key]
+    
+    jobs = job_queue.stats()
+    yield 'sahayak_job_queue_depth', 'gauge', 'Jobs waiting for a worker', {}, jobs['queueDepth']
+    yield 'sahayak_job_workers_busy', 'gauge', 'Job workers running a job', {}, jobs['busyWorkers']
+    for key, count in jobs['counts'].items():
+        yield 'sahayak_jobs_total', 'counter', 'Jobs by outcome', {'outcome': key}, count
+    
+    blobs = blob_store.stats()
+    yield 'sahayak_blobs', 'gauge', 'Stored media blobs', {}, blobs['blobs']
+    yield 'sahayak_blob_bytes', 'gauge', 'Bytes of stored media', {}, blobs['bytes']
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.registry.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+# Profiles of slow requests captured by the sampling profiler
+@app.route('/api/debug/profiles', methods=['GET'])
+def list_profiles():
+    if profiler is None:
+        return jsonify({'error': 'Profiler is disabled; set SAHAYAK_PROFILE_THRESHOLD_MS'}), 404
+    return jsonify({
+        'success': True,
+        'thresholdMs': profiler.threshold * 1000,
+        'profiles': profiler.profiles()
+    })
+
+@app.route('/api/debug/profiles/<trace_id>', methods=['GET'])
+def get_profile(trace_id):
+    profile = profiler.get(trace_id) if profiler else None
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    # ?format=collapsed gives input for flamegraph.pl / speedscope
+    if request.args.get('format') == 'collapsed':
+        return Response(collapsed(profile), mimetype='text/plain')
+    return jsonify({
+        **profile,
+        'stacks': [{'stack': stack, 'count': count} for stack, count in profile['stacks'].most_common(100)]
+    })
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -445,22 +1216,54 @@ def health_check():
         'version': '2.0.0'
     })
 
-# Serve React app
+@app.cli.command('check-stats')
+@click.option('--rebuild', is_flag=True, help='Recount all user statistics from the stored records')
+def check_stats(rebuild):
+    """Verify per-user statistics counters against the stored records"""
+    mismatched = store.verify_stats()
+    click.echo(f"{len(mismatched)} user(s) with inconsistent stats")
+    for user_id in mismatched:
+        click.echo(f"  {user_id}")
+    if rebuild:
+        click.echo(f"Rebuilt stats for {store.rebuild_stats()} user(s)")
+
+@app.cli.command('delete-record')
+@click.argument('collection', type=click.Choice(store.collections))
+@click.argument('record_id')
+def delete_record_command(collection, record_id):
+    """Delete one stored record; its media becomes collectable by gc-blobs"""
+    if delete_record(collection, record_id) is None:
+        raise click.ClickException(f"No {collection} record {record_id}")
+    click.echo(f"Deleted {collection} record {record_id}")
+
+@app.cli.command('gc-blobs')
+@click.option('--grace-hours', default=24.0, help='Keep unreferenced blobs younger than this')
+def gc_blobs(grace_hours):
+    """Delete uploaded media that no stored record references"""
+    result = blob_store.gc(grace_seconds=grace_hours * 3600)
+    click.echo(f"Removed {result['removed']} blob(s), freed {result['bytesFreed']} bytes")
+
+# Serve React app, indexed and precompressed once at startup
+static_assets = StaticAssets(os.path.join(os.path.dirname(__file__), 'static'))
+
+def _serve_static(path):
+    asset = static_assets.get(path)
+    if asset is None:
+        # For React Router, serve index.html for all other routes
+        asset = static_assets.get('index.html')
+    if asset is None:
+        return jsonify({'error': 'Frontend not built'}), 404
+    return static_assets.response(asset, request)
+
 @app.route('/')
 def serve_react_app():
-    return send_from_directory(app.static_folder, 'index.html')
+    return _serve_static('index.html')
 
 @app.route('/<path:path>')
 def serve_react_routes(path):
     if path.startswith('api/'):
         return jsonify({'error': 'API endpoint not found'}), 404
-    
-    # Check if file exists in static folder
-    if os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    
-    # For React Router, serve index.html for all other routes
-    return send_from_directory(app.static_folder, 'index.html')
+    return _serve_static(path)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
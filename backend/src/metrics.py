@@ -0,0 +1,234 @@
+import time
+import inspect
+import functools
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+# Prometheus text exposition format, without the prometheus_client dependency.
+# Metric updates take one small lock and do no formatting; all rendering
+# happens when /metrics is scraped.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self._header()
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Metrics plus collector callbacks that read other components' stats at scrape time"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, fn):
+        """Register fn() -> iterable of (name, type, help, labels, value); usable as a decorator"""
+        self._collectors.append(fn)
+        return fn
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        seen = set()
+        for collect in self._collectors:
+            for name, kind, help, labels, value in collect():
+                if value is None:
+                    continue
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# HELP {name} {help}')
+                    lines.append(f'# TYPE {name} {kind}')
+                names, values = tuple(labels), tuple(labels.values())
+                lines.append(f'{name}{_labels(names, values)} {_number(float(value))}')
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram: Histogram, errors: Optional[Counter], fn: Callable, *labels: str) -> Callable:
+    """Wrap fn so each call's duration is observed (and failures counted).
+
+    Generator functions are timed until they are exhausted or closed, so a
+    streamed generation counts its whole duration rather than its creation;
+    coroutine functions and async generators are timed the same way.
+    """
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def async_stream_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            stream = fn(*args, **kwargs)
+            try:
+                async for item in stream:
+                    yield item
+            except GeneratorExit:
+                raise
+            except Exception:
+                if errors is not None:
+                    errors.inc(*labels)
+                raise
+            finally:
+                await stream.aclose()
+                histogram.observe(time.perf_counter() - started, *labels)
+        return async_stream_wrapper
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(*labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started, *labels)
+        return async_wrapper
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return (yield from fn(*args, **kwargs))
+            except GeneratorExit:
+                raise
+            except Exception:
+                if errors is not None:
+                    errors.inc(*labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started, *labels)
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            if errors is not None:
+                errors.inc(*labels)
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started, *labels)
+    return wrapper
+
+
+def instrument(obj: Any, histogram: Histogram, errors: Optional[Counter], methods: Iterable[str]):
+    """Time the named methods of one object (labelled by method name), leaving its class untouched"""
+    for name in methods:
+        setattr(obj, name, timed(histogram, errors, getattr(obj, name), name))
+    return obj
+
+
+registry = Registry()
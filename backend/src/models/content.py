@@ -0,0 +1,71 @@
+from models.user import db
+
+class ContentRecord(db.Model):
+    """A generated record (content, worksheet, visual aid, assessment or video)"""
+    __tablename__ = 'content_records'
+
+    id = db.Column(db.String(64), primary_key=True)
+    collection = db.Column(db.String(32), nullable=False)
+    user_id = db.Column(db.String(128), nullable=False)
+    content_type = db.Column(db.String(64))
+    subject = db.Column(db.String(128))
+    created_at = db.Column(db.Float, nullable=False)
+    # The full record as JSON; the columns above are only for indexing
+    data = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        # Ids are time-sortable, so these also order each user's records by creation
+        db.Index('ix_content_records_user', 'collection', 'user_id', 'id'),
+        db.Index('ix_content_records_user_type', 'collection', 'user_id', 'content_type', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<ContentRecord {self.collection}/{self.id}>'
+
+class UserStat(db.Model):
+    """Per-user counter, e.g. (user, 'subjects', 'Mathematics') -> 12"""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.String(128), primary_key=True)
+    dimension = db.Column(db.String(32), primary_key=True)
+    key = db.Column(db.String(128), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UserStat {self.user_id} {self.dimension}/{self.key}={self.count}>'
+
+class TeacherProfile(db.Model):
+    """Teacher account created through /api/auth, stored as JSON keyed by email"""
+    __tablename__ = 'teacher_profiles'
+
+    email = db.Column(db.String(120), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<TeacherProfile {self.email}>'
+
+class CachedGeneration(db.Model):
+    """Response cache entry shared by every worker process (SAHAYAK_SHARED_STATE)"""
+    __tablename__ = 'cached_generations'
+
+    key = db.Column(db.String(256), primary_key=True)
+    expires_at = db.Column(db.Float, nullable=False)
+    # Set on store and on every hit; the least recently used entries are evicted first
+    last_used = db.Column(db.Float, nullable=False, index=True)
+    data = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<CachedGeneration {self.key}>'
+
+class JobRecord(db.Model):
+    """Latest public view of a background job, readable from any worker process"""
+    __tablename__ = 'job_records'
+
+    id = db.Column(db.String(64), primary_key=True)
+    # 0 queued, 1 running, 2 finished: a status write never moves a job back a stage
+    stage = db.Column(db.Integer, nullable=False, default=0)
+    finished_at = db.Column(db.Float, index=True)
+    data = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<JobRecord {self.id}>'
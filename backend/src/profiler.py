@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+MAX_STACK_DEPTH = 64
+
+
+class SamplingProfiler:
+    """Statistical profiler for slow requests.
+
+    A background thread wakes every ``interval`` seconds and records the
+    current stack of every thread that is handling a request. When a request
+    finishes, its samples are kept (with the request's trace) if it took at
+    least ``threshold`` seconds and thrown away otherwise, so only slow
+    requests pay for storage. The ``keep`` most recent profiles are retained.
+    Stacks are in collapsed form ("outer;inner;leaf"), ready for flame graph
+    tools.
+    """
+
+    def __init__(self, threshold: float = 1.0, interval: float = 0.005, keep: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self._active: Dict[int, Counter] = {}
+        self._profiles: "deque[Dict[str, Any]]" = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+
+    def begin(self):
+        """Start sampling the calling thread"""
+        self._ensure_sampler()
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, trace, duration: float, **details) -> bool:
+        """Stop sampling the calling thread; keep the profile if the request was slow"""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples is None or duration < self.threshold:
+            return False
+        profile = {
+            'traceId': trace.id,
+            **details,
+            'durationMs': round(duration * 1000, 1),
+            'capturedAt': time.time(),
+            'samples': sum(samples.values()),
+            'intervalMs': self.interval * 1000,
+            'spans': trace.describe(),
+            'stacks': samples
+        }
+        with self._lock:
+            self._profiles.append(profile)
+        return True
+
+    def profiles(self) -> List[Dict[str, Any]]:
+        """Summaries of the retained profiles, newest first"""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [{key: value for key, value in profile.items() if key not in ('spans', 'stacks')}
+                for profile in reversed(profiles)]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile['traceId'] == trace_id:
+                    return profile
+        return None
+
+    def _ensure_sampler(self):
+        # Started lazily, and again in a forked child where the thread didn't survive
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._active.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def collapsed(profile: Dict[str, Any]) -> str:
+    """A profile's stacks in the collapsed text format (one "stack count" per line)"""
+    return ''.join(f"{stack} {count}\n" for stack, count in profile['stacks'].most_common())
@@ -0,0 +1,155 @@
+import json
+import hashlib
+import string
+import threading
+from typing import Dict, Any, List, Tuple, NamedTuple
+
+
+def normalize(value: Any) -> str:
+    """Canonical form of a request parameter: collapsed whitespace, case-folded"""
+    return ' '.join(str(value).split()).casefold()
+
+
+class RenderedPrompt(NamedTuple):
+    text: str
+    template: str
+    version: str
+    fingerprint: str
+
+
+class PromptTemplate:
+    """A prompt compiled once into literal/field pieces so rendering is a join"""
+
+    def __init__(self, name: str, version: str, source: str):
+        self.name = name
+        self.version = version
+        self.source = source
+        self._pieces: List[Tuple[str, str]] = [
+            (literal, field or '') for literal, field, _, _ in string.Formatter().parse(source)
+        ]
+        self.fields = sorted({field for _, field in self._pieces if field})
+        # Editing the text changes the fingerprint even if nobody bumps the version
+        self.digest = hashlib.sha256(f"{name}:{version}:{source}".encode('utf-8')).hexdigest()[:16]
+
+    def render(self, params: Dict[str, Any]) -> str:
+        parts = []
+        for literal, field in self._pieces:
+            parts.append(literal)
+            if field:
+                parts.append(str(params[field]))
+        return ''.join(parts)
+
+    def fingerprint(self, params: Dict[str, Any]) -> str:
+        """Stable hash of (template version, normalized parameters)"""
+        canonical = json.dumps({key: normalize(params[key]) for key in self.fields}, sort_keys=True)
+        return hashlib.sha256(f"{self.digest}:{canonical}".encode('utf-8')).hexdigest()[:32]
+
+
+class PromptRegistry:
+    """Named, versioned prompt templates shared by every AIService call"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, version: str, source: str) -> PromptTemplate:
+        template = PromptTemplate(name, version, source)
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **params) -> RenderedPrompt:
+        template = self._templates[name]
+        return RenderedPrompt(template.render(params), name, template.version, template.fingerprint(params))
+
+    def fingerprint(self, name: str, **params) -> str:
+        return self._templates[name].fingerprint(params)
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {'version': template.version, 'digest': template.digest, 'fields': template.fields}
+                for name, template in self._templates.items()}
+
+
+prompt_registry = PromptRegistry()
+
+# Bump a template's version whenever its text or the mock output behind it
+# changes, so cached generations produced by the old prompt are not reused.
+prompt_registry.register('content', '1', """\
+Create educational content for rural teachers in {language}.
+
+Subject: {subject}
+Grade Level: {grade}
+Topic: {topic}
+Content Type: {content_type}
+
+Requirements:
+- Use simple, clear language appropriate for {grade} students
+- Include culturally relevant examples from rural Indian contexts
+- Provide practical activities using locally available materials
+- Make content engaging and interactive
+- Include assessment methods suitable for multi-grade classrooms
+- Ensure content is appropriate for low-resource settings
+
+Generate comprehensive {content_type} content that teachers can use immediately.
+""")
+
+prompt_registry.register('worksheet', '1', """\
+Create a worksheet for rural students in {language}.
+
+Subject: {subject}
+Grade Level: {grade}
+Topic: {topic}
+Difficulty: {difficulty}
+Student Level: {student_level}
+
+Requirements:
+- Include multiple question types (MCQ, short answer, problem-solving)
+- Adapt difficulty to {student_level} students
+- Use examples relevant to rural life
+- Provide clear instructions in {language}
+- Include assessment rubric for teachers
+- Make it suitable for multi-grade classrooms
+
+Generate a complete worksheet with answer key.
+""")
+
+prompt_registry.register('visual_aid', '1', """\
+Create instructions for making a {aid_type} about {topic} in {language}.
+
+Subject: {subject}
+Grade Level: {grade}
+Visual Aid Type: {aid_type}
+
+Requirements:
+- Use only low-cost, locally available materials
+- Provide step-by-step creation instructions
+- Include classroom usage guidelines
+- Make it engaging for {grade} students
+- Ensure it's suitable for rural classroom settings
+- Include cultural context relevant to rural India
+
+Generate detailed instructions that any teacher can follow.
+""")
+
+prompt_registry.register('image_analysis', '1', """\
+Analyze this image for educational opportunities in {language}.
+
+Context:
+- Subject: {subject}
+- Grade Level: {grade}
+- Rural classroom setting
+
+Provide:
+1. Description of what's in the image
+2. Educational concepts that can be taught
+3. Lesson plan ideas
+4. Discussion questions for students
+5. Cross-curricular connections
+6. Assessment ideas
+7. Cultural connections relevant to rural India
+
+Format response as JSON with these sections.
+""")
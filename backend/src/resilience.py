@@ -0,0 +1,245 @@
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast while the upstream error rate is high.
+
+    Closed: calls go through and their outcomes are kept for ``window``
+    seconds. Once at least ``min_calls`` outcomes are recorded and the
+    failure ratio reaches ``failure_threshold``, the breaker opens and calls
+    raise CircuitOpenError without touching the upstream. After
+    ``reset_timeout`` seconds it lets a single trial call through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: float = 0.5, min_calls: int = 20,
+                 window: float = 30.0, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self._outcomes = deque()
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._counts = {'opened': 0, 'shortCircuited': 0}
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be refused (open and not yet due a trial call)"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._counts['shortCircuited'] += 1
+        raise CircuitOpenError('Model backend is failing; circuit breaker is open')
+
+    def record(self, ok: Optional[bool]):
+        """Record a call's outcome; None means the call never reached the upstream"""
+        now = time.monotonic()
+        with self._lock:
+            if ok is None:
+                if self.state == self.HALF_OPEN:
+                    self._trial_in_flight = False
+                return
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if ok:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_threshold):
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._counts['opened'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            failures = sum(1 for _, success in self._outcomes if not success)
+            return {
+                'state': self.state,
+                'recentCalls': len(self._outcomes),
+                'recentFailures': failures,
+                **self._counts
+            }
+
+
+class Hedger:
+    """Send a duplicate call when the first one is slower than usual.
+
+    The first attempt starts immediately; if it hasn't finished after the
+    ``percentile`` latency of recent calls, a second identical attempt is
+    started and whichever finishes first wins. Hedges are limited to
+    ``budget`` of all calls so a uniformly slow upstream doesn't double its
+    own load, and no hedging happens until ``min_samples`` latencies are
+    known. While no hedge could be sent, the attempt simply runs in the
+    calling thread; otherwise attempts run on a pool in a copy of the
+    caller's context (so trace spans and metric labels still apply), and
+    a losing thread runs to completion in the background, while a losing
+    task is cancelled.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20,
+                 budget: float = 0.1, max_workers: int = 32, sample_size: int = 500):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget = budget
+        self._latencies = deque(maxlen=sample_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self._counts = {'calls': 0, 'hedgesFired': 0, 'hedgesWon': 0, 'hedgesSkipped': 0}
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            samples = sorted(self._latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * self.percentile))]
+
+    def call(self, attempt: Callable[[], Any], can_hedge: Callable[[], bool] = lambda: True,
+             hedge: Optional[Callable[[], Any]] = None) -> Any:
+        """Run attempt(), hedged with hedge() (by default attempt() again) if the first is slow.
+
+        ``can_hedge`` is asked right before the duplicate is sent, so the caller
+        can refuse when the upstream has no spare capacity.
+        """
+        delay = self._hedge_delay()
+        started = time.monotonic()
+        if delay is None:
+            return self._finish(attempt(), started)
+
+        primary = self._submit(attempt)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return self._finish(primary.result(), started)
+
+        if not self._fire(can_hedge):
+            return self._finish(primary.result(), started)
+
+        duplicate = self._submit(hedge or attempt)
+        pending = {primary, duplicate}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is duplicate:
+                        with self._lock:
+                            self._counts['hedgesWon'] += 1
+                    return self._finish(future.result(), started)
+        # Both attempts failed; report the original error
+        return primary.result()
+
+    async def acall(self, attempt: Callable[[], Awaitable[Any]],
+                    can_hedge: Callable[[], bool] = lambda: True,
+                    hedge: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """Event-loop counterpart of call(): attempts are tasks, and the loser is cancelled"""
+        delay = self._hedge_delay()
+        started = time.monotonic()
+        if delay is None:
+            return self._finish(await attempt(), started)
+
+        primary = asyncio.ensure_future(attempt())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._fire(can_hedge):
+                return self._finish(await primary, started)
+
+            duplicate = asyncio.ensure_future((hedge or attempt)())
+            try:
+                pending = {primary, duplicate}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is duplicate:
+                                with self._lock:
+                                    self._counts['hedgesWon'] += 1
+                            return self._finish(task.result(), started)
+                return await primary
+            finally:
+                await _cancel(duplicate)
+        finally:
+            await _cancel(primary)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Count a call; the hedge delay, or None if this call cannot be hedged"""
+        delay = self.delay()
+        with self._lock:
+            self._counts['calls'] += 1
+            if self._counts['hedgesFired'] >= self.budget * self._counts['calls']:
+                return None
+        return delay
+
+    def _submit(self, attempt: Callable[[], Any]):
+        return self._executor.submit(contextvars.copy_context().run, attempt)
+
+    def _fire(self, can_hedge: Callable[[], bool]) -> bool:
+        """Whether to send a hedge now, counting it as fired or skipped"""
+        with self._lock:
+            within_budget = self._counts['hedgesFired'] < self.budget * self._counts['calls']
+        if not within_budget or not can_hedge():
+            with self._lock:
+                self._counts['hedgesSkipped'] += 1
+            return False
+        with self._lock:
+            self._counts['hedgesFired'] += 1
+        return True
+
+    def _finish(self, result: Any, started: float) -> Any:
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.delay()
+        with self._lock:
+            return {
+                **self._counts,
+                'delayMs': round(delay * 1000, 1) if delay is not None else None
+            }
+
+
+async def _cancel(task: asyncio.Future):
+    """Cancel a hedging attempt that lost (or was abandoned) and wait until it has let go of its resources"""
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+        return
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
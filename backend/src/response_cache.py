@@ -0,0 +1,193 @@
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable, Tuple
+
+from prompts import prompt_registry
+
+# Top-level flags on results that were not generated for this call; never part of the metadata saved with a record
+CACHE_FLAGS = ('cached', 'stale', 'coalesced')
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a per-entry time-to-live.
+
+    Expired entries are not served by get() but stay until the LRU evicts
+    them, so get_stale() can fall back on them while the model is down.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0, 'bypasses': 0,
+                        'staleServed': 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                self._counts['expirations'] += 1
+                self._counts['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts['hits'] += 1
+            return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value even if it has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._counts['staleServed'] += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts['evictions'] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self._counts['bypasses'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counts['hits'] + self._counts['misses']
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                **self._counts,
+                'hitRatio': self._counts['hits'] / lookups if lookups else 0.0
+            }
+
+
+def cached_generation(template: str):
+    """Cache and coalesce results of an AIService method keyed on its prompt fingerprint.
+
+    The key is the fingerprint of the named prompt template rendered with the
+    method's normalized arguments, so changing a template's text or version
+    stops old outputs from being served. The wrapped method gains a
+    ``use_cache`` keyword; passing ``use_cache=False`` skips the lookup and
+    always calls through. On a miss, concurrent callers with the same key
+    share one upstream call through the service's ``flight`` (``flight.ado``
+    for coroutine methods, which get an async wrapper). While the
+    service's backend is unavailable (circuit breaker open) an expired entry
+    is served rather than degraded output, and degraded results are never
+    cached. A served entry, or a result shared with a coalesced caller,
+    carries this caller's own arguments in its metadata and is marked with
+    ``cached`` (and ``stale``) or ``coalesced`` next to it.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        def params_for(self, args, kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            return {name: value for name, value in bound.arguments.items() if name != 'self'}
+
+        def key_for(params):
+            return (template, prompt_registry.fingerprint(template, **params))
+
+        def reuse(result, params, **flags):
+            # The key is normalized (topic casing, whitespace), so the stored metadata may hold another caller's spelling
+            metadata = result['metadata']
+            own = {name: value for name, value in params.items() if name in metadata}
+            return {**result, 'metadata': {**metadata, **own}, **flags}
+
+        def lookup(self, cache, key, params):
+            result = cache.get(key)
+            if result is not None:
+                return reuse(result, params, cached=True)
+            backend = getattr(self, 'backend', None)
+            if backend is not None and not backend.available:
+                result = cache.get_stale(key)
+                if result is not None:
+                    return reuse(result, params, cached=True, stale=True)
+            return None
+
+        def store(cache, key, result):
+            if cache is not None and result.get('success') and not result['metadata'].get('degraded'):
+                cache.set(key, result)
+            return result
+
+        def shared(result, coalesced, params):
+            if coalesced and result.get('success'):
+                return reuse(result, params, coalesced=True)
+            return result
+
+        if inspect.iscoroutinefunction(method):
+            # Async methods coalesce on the event loop through flight.ado
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, use_cache: bool = True, **kwargs):
+                cache = getattr(self, 'cache', None)
+                flight = getattr(self, 'flight', None)
+                if not use_cache:
+                    if cache is not None:
+                        cache.record_bypass()
+                    return await method(self, *args, **kwargs)
+                if cache is None and flight is None:
+                    return await method(self, *args, **kwargs)
+
+                params = params_for(self, args, kwargs)
+                key = key_for(params)
+                if cache is not None:
+                    result = lookup(self, cache, key, params)
+                    if result is not None:
+                        return result
+
+                async def call():
+                    return store(cache, key, await method(self, *args, **kwargs))
+
+                if flight is None:
+                    return await call()
+                return shared(*await flight.ado(key, call), params)
+
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, use_cache: bool = True, **kwargs):
+            cache = getattr(self, 'cache', None)
+            flight = getattr(self, 'flight', None)
+            if not use_cache:
+                if cache is not None:
+                    cache.record_bypass()
+                return method(self, *args, **kwargs)
+            if cache is None and flight is None:
+                return method(self, *args, **kwargs)
+
+            params = params_for(self, args, kwargs)
+            key = key_for(params)
+            if cache is not None:
+                result = lookup(self, cache, key, params)
+                if result is not None:
+                    return result
+
+            def call():
+                return store(cache, key, method(self, *args, **kwargs))
+
+            if flight is None:
+                return call()
+            return shared(*flight.do(key, call), params)
+
+        return wrapper
+    return decorator
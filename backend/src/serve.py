@@ -0,0 +1,177 @@
+"""Production server: pre-forked worker processes sharing one listening socket.
+
+    python serve.py --workers 4 --port 5000              # threaded Flask workers
+    python serve.py --worker-class asgi --port 5000      # event-loop workers (needs uvicorn)
+
+The master binds the socket, prepares the SQLite database, then forks
+--workers processes (default: one per core) that each import the app and
+accept connections from the shared socket. Workers run with
+SAHAYAK_SHARED_STATE=1, so records, teacher profiles, the response cache
+and background job status all live in the one SQLite database and every
+worker gives the same answers. A worker that dies is replaced; SIGTERM or
+SIGINT stops the workers gracefully (SIGKILL after --graceful-timeout).
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+
+import tracing
+
+# Configured here, before main is imported (which then leaves logging alone), so it must add the trace id too
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)s %(name)s [%(process)d] [trace=%(trace_id)s] %(message)s')
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(tracing.TraceIdFilter())
+logger = logging.getLogger('serve')
+
+# A worker exiting sooner than this after starting counts as a crash loop
+MIN_WORKER_LIFETIME = 1.0
+REAP_INTERVAL = 0.2
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _prepare_database():
+    """Create the schema once in the master, so workers don't race to create it"""
+    if os.environ.get('SAHAYAK_STORE', 'sqlite') == 'memory':
+        raise SystemExit('serve.py shares state through SQLite; unset SAHAYAK_STORE=memory')
+    from sqlite_store import SqliteStore
+    path = os.environ.get('SAHAYAK_DB_PATH', os.path.join(os.path.dirname(__file__), 'database', 'sahayak.db'))
+    # Closed again before forking: SQLite connections must not cross a fork
+    SqliteStore(path, pool_size=1).close()
+
+
+def _prepare_static():
+    """Index the frontend once, so its compressed variants are written before workers start"""
+    from static_assets import StaticAssets
+    StaticAssets(os.path.join(os.path.dirname(__file__), 'static'))
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _run_worker(index: int, sock: socket.socket, args):
+    """Body of a forked worker process; never returns"""
+    # Distinct snowflake node ids per worker, stable across restarts of the same slot
+    base = int(os.environ.get('SAHAYAK_NODE_ID', '0'))
+    os.environ['SAHAYAK_NODE_ID'] = str(base + index)
+    # Ctrl-C reaches the whole process group; let the master decide how workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    if args.worker_class == 'asgi':
+        import uvicorn
+        server = uvicorn.Server(uvicorn.Config('asgi:app', fd=sock.fileno(), log_level='warning',
+                                               timeout_graceful_shutdown=args.graceful_timeout))
+        server.run()
+    else:
+        from werkzeug.serving import make_server
+        import main
+        server = make_server(args.host, args.port, main.app, threaded=True, fd=sock.fileno())
+        # Let server_close wait for in-flight requests; serve_forever treats KeyboardInterrupt as a clean stop
+        server.daemon_threads = False
+        server.block_on_close = True
+        signal.signal(signal.SIGTERM, _interrupt)
+        server.serve_forever()
+    os._exit(0)
+
+
+class Master:
+    """Keeps --workers children alive until told to stop"""
+
+    def __init__(self, sock: socket.socket, args):
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> (slot index, started at)
+        self.stopping = False
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(index, self.sock, self.args)
+            except BaseException:
+                logging.getLogger('serve').exception('Worker %s failed', index)
+            finally:
+                os._exit(1)
+        self.workers[pid] = (index, time.monotonic())
+        logger.info('Started worker %s (pid %s)', index, pid)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for index in range(self.args.workers):
+            self.spawn(index)
+
+        # Poll rather than block in os.wait(), which resumes after a signal and would miss _stop
+        while not self.stopping:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0 or pid not in self.workers:
+                time.sleep(REAP_INTERVAL)
+                continue
+            index, started = self.workers.pop(pid)
+            logger.warning('Worker %s (pid %s) exited with status %s; restarting', index, pid, status)
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn(index)
+        self._shutdown()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _shutdown(self):
+        logger.info('Stopping %s worker(s)', len(self.workers))
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(REAP_INTERVAL)
+        for pid in self.workers:
+            logger.warning('Worker pid %s did not stop in time; killing it', pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--worker-class', choices=('sync', 'asgi'), default='sync',
+                        help='threaded Flask workers, or event-loop workers running asgi.py')
+    parser.add_argument('--backlog', type=int, default=2048, help='listen queue length')
+    parser.add_argument('--graceful-timeout', type=float, default=30,
+                        help='seconds workers get to finish in-flight requests on shutdown')
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        raise SystemExit('serve.py needs os.fork; run a single process with "python main.py" instead')
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ['SAHAYAK_SHARED_STATE'] = '1'
+    _prepare_database()
+    _prepare_static()
+    sock = _bind(args.host, args.port, args.backlog)
+    logger.info('Listening on %s:%s with %s %s worker(s)', args.host, args.port, args.workers, args.worker_class)
+    Master(sock, args).run()
+
+
+if __name__ == '__main__':
+    main()
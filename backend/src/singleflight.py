@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from typing import Dict, Any, Awaitable, Callable, Hashable, Tuple
+
+
+class _Call:
+    """One in-flight upstream call shared by every caller with the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+        # Set instead of done/result/error for calls made from the event loop
+        self.task = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        # Calls made from the event loop, kept apart so neither kind blocks on the other
+        self._async_calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._counts = {'executions': 0, 'coalesced': 0, 'maxWaiters': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per key at a time.
+
+        Returns (result, shared) where shared is True for callers that waited on
+        another caller's execution instead of running fn themselves. Exceptions
+        raised by fn are re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counts['coalesced'] += 1
+                self._counts['maxWaiters'] = max(self._counts['maxWaiters'], call.waiters)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._counts['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Event-loop counterpart of do(), coalescing calls whose fn is a coroutine function.
+
+        Waiters are shielded from each other's cancellation: a client going
+        away does not cancel the upstream call the others are waiting on.
+        """
+        with self._lock:
+            call = self._async_calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counts['coalesced'] += 1
+                self._counts['maxWaiters'] = max(self._counts['maxWaiters'], call.waiters)
+                leader = False
+            else:
+                call = self._async_calls[key] = _Call()
+                call.task = asyncio.ensure_future(fn())
+                self._counts['executions'] += 1
+                leader = True
+        if leader:
+            call.task.add_done_callback(lambda _: self._forget(key))
+        return await asyncio.shield(call.task), not leader
+
+    def _forget(self, key: Hashable):
+        with self._lock:
+            del self._async_calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = {**self._calls, **self._async_calls}
+            return {
+                **self._counts,
+                'inFlight': len(calls),
+                'waiters': {_describe(key): call.waiters for key, call in calls.items()}
+            }
+
+
+def _describe(key: Hashable) -> str:
+    if isinstance(key, tuple):
+        return '|'.join(str(part) for part in key)
+    return str(key)
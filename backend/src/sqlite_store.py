@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import threading
+from collections import Counter
+from typing import Dict, Any, Hashable, List, Optional
+
+from sqlalchemy import create_engine, event, select, insert, update, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import QueuePool
+
+from models.user import db
+from models.content import ContentRecord, UserStat, TeacherProfile, CachedGeneration, JobRecord
+from content_store import COLLECTIONS, stat_keys, record_json
+
+records = ContentRecord.__table__
+stats = UserStat.__table__
+profiles = TeacherProfile.__table__
+cache_entries = CachedGeneration.__table__
+job_records = JobRecord.__table__
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    """Per-connection SQLite settings: WAL lets readers run alongside the writer"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=30000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+class SqliteStore:
+    """Durable drop-in replacement for ContentStore backed by SQLite in WAL mode.
+
+    Records are stored as JSON alongside the columns they are queried by, with
+    (collection, user_id, id) indexes so per-user listings are index range
+    scans; ids are time-sortable, so id order is creation order. Per-user counters live in user_stats and are updated in the
+    same transaction as the write that changes them. The database file can be
+    shared by several worker processes.
+    """
+
+    def __init__(self, path: str, pool_size: int = 5, max_overflow: int = 10):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.engine = create_engine(
+            f"sqlite:///{path}",
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            connect_args={'check_same_thread': False, 'timeout': 30}
+        )
+        event.listen(self.engine, 'connect', _configure_connection)
+        db.metadata.create_all(self.engine, tables=[records, stats, profiles, cache_entries, job_records])
+
+    @property
+    def collections(self):
+        return COLLECTIONS
+
+    def close(self):
+        self.engine.dispose()
+
+    # Teacher profiles
+
+    def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            data = conn.execute(select(profiles.c.data).where(profiles.c.email == email)).scalar()
+        return json.loads(data) if data is not None else None
+
+    def save_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        stmt = sqlite_insert(profiles).values(email=user['email'], data=json.dumps(user))
+        stmt = stmt.on_conflict_do_update(index_elements=[profiles.c.email], set_={'data': stmt.excluded.data})
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+        return user
+
+    # Records
+
+    def insert(self, collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a record (which must carry id, userId and createdAt), replacing one with the same id"""
+        deltas = Counter()
+        with self.engine.begin() as conn:
+            existing = conn.execute(
+                select(records.c.collection, records.c.data).where(records.c.id == record['id'])
+            ).first()
+            if existing is not None:
+                conn.execute(delete(records).where(records.c.id == record['id']))
+                _add_deltas(deltas, existing.collection, json.loads(existing.data), -1)
+            conn.execute(insert(records), [_row(collection, record)])
+            _add_deltas(deltas, collection, record, 1)
+            self._apply_deltas(conn, deltas)
+        return record
+
+    def insert_many(self, collection: str, new_records: List[Dict[str, Any]]) -> int:
+        """Insert many new records (ids must not exist yet) in a single transaction"""
+        if not new_records:
+            return 0
+        deltas = Counter()
+        for record in new_records:
+            _add_deltas(deltas, collection, record, 1)
+        with self.engine.begin() as conn:
+            conn.execute(insert(records), [_row(collection, record) for record in new_records])
+            self._apply_deltas(conn, deltas)
+        return len(new_records)
+
+    def get(self, collection: str, record_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            data = conn.execute(
+                select(records.c.data).where(records.c.id == record_id, records.c.collection == collection)
+            ).scalar()
+        return json.loads(data) if data is not None else None
+
+    def get_json(self, collection: str, record_id: str) -> Optional[bytes]:
+        """The record exactly as stored, which is already JSON; nothing is decoded or re-encoded"""
+        with self.engine.connect() as conn:
+            data = conn.execute(
+                select(records.c.data).where(records.c.id == record_id, records.c.collection == collection)
+            ).scalar()
+        return data.encode('utf-8') if data is not None else None
+
+    def delete(self, collection: str, record_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.begin() as conn:
+            data = conn.execute(
+                select(records.c.data).where(records.c.id == record_id, records.c.collection == collection)
+            ).scalar()
+            if data is None:
+                return None
+            record = json.loads(data)
+            conn.execute(delete(records).where(records.c.id == record_id))
+            deltas = Counter()
+            _add_deltas(deltas, collection, record, -1)
+            self._apply_deltas(conn, deltas)
+        return record
+
+    def list_user(self, collection: str, user_id: str, content_type: Optional[str] = None,
+                  limit: Optional[int] = None,
+                  after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return a user's records newest first; see ContentStore.list_user"""
+        query = select(records.c.data).where(records.c.collection == collection,
+                                             records.c.user_id == user_id)
+        if content_type:
+            query = query.where(records.c.content_type == content_type)
+        if after is not None:
+            query = query.where(records.c.id < after)
+        query = query.order_by(records.c.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+
+        with self.engine.connect() as conn:
+            return [json.loads(data) for data in conn.execute(query).scalars()]
+
+    # Statistics
+
+    def count_user(self, collection: str, user_id: str) -> int:
+        return self.user_stats(user_id)['collections'].get(collection, 0)
+
+    def user_stats(self, user_id: str) -> Dict[str, Dict[str, int]]:
+        result = {'collections': {}, 'subjects': {}, 'contentTypes': {}}
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(stats.c.dimension, stats.c['key'], stats.c['count']).where(stats.c.user_id == user_id)
+            )
+            for dimension, key, count in rows:
+                result.setdefault(dimension, {})[key] = count
+        return result
+
+    def verify_stats(self) -> List[str]:
+        """Recount every record and return the ids of users whose counters disagree"""
+        with self.engine.connect() as conn:
+            expected = _recount(conn)
+            actual = Counter({
+                (user_id, dimension, key): count
+                for user_id, dimension, key, count in conn.execute(
+                    select(stats.c.user_id, stats.c.dimension, stats.c['key'], stats.c['count'])
+                ) if count
+            })
+        return sorted({key[0] for key in set(expected) | set(actual) if expected[key] != actual[key]})
+
+    def rebuild_stats(self) -> int:
+        """Replace all counters with a fresh recount; returns the number of users"""
+        with self.engine.begin() as conn:
+            expected = _recount(conn)
+            conn.execute(delete(stats))
+            if expected:
+                conn.execute(insert(stats), [
+                    {'user_id': user_id, 'dimension': dimension, 'key': key, 'count': count}
+                    for (user_id, dimension, key), count in expected.items()
+                ])
+        return len({key[0] for key in expected})
+
+    def _apply_deltas(self, conn, deltas: Counter):
+        rows = [{'user_id': user_id, 'dimension': dimension, 'key': key, 'count': delta}
+                for (user_id, dimension, key), delta in deltas.items() if delta]
+        if not rows:
+            return
+        stmt = sqlite_insert(stats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[stats.c.user_id, stats.c.dimension, stats.c['key']],
+            set_={'count': stats.c['count'] + stmt.excluded['count']}
+        )
+        conn.execute(stmt, rows)
+        if any(row['count'] < 0 for row in rows):
+            conn.execute(delete(stats).where(stats.c['count'] <= 0))
+
+
+class SqliteResponseCache:
+    """Drop-in replacement for ResponseCache kept in the store's database.
+
+    Every worker process sharing the database sees the same entries, so a
+    generation cached by one worker is a hit on all of them. Entries carry
+    an expiry time; expired entries stay for get_stale() until evicted, and
+    the least recently used entries are evicted first once there are more
+    than ``max_entries``, as in ResponseCache. Hit and miss counters are per
+    process.
+    """
+
+    def __init__(self, engine, max_entries: int = 1024, ttl: float = 3600):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'expirations': 0, 'evictions': 0, 'bypasses': 0,
+                        'staleServed': 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry"""
+        with self.engine.connect() as conn:
+            row = conn.execute(select(cache_entries.c.expires_at, cache_entries.c.data)
+                               .where(cache_entries.c.key == _cache_key(key))).first()
+        with self._lock:
+            if row is None:
+                self._counts['misses'] += 1
+                return None
+            if row.expires_at <= time.time():
+                self._counts['expirations'] += 1
+                self._counts['misses'] += 1
+                return None
+            self._counts['hits'] += 1
+        self._touch(key)
+        return json.loads(row.data)
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value even if it has expired"""
+        with self.engine.connect() as conn:
+            data = conn.execute(select(cache_entries.c.data)
+                                .where(cache_entries.c.key == _cache_key(key))).scalar()
+        if data is None:
+            return None
+        with self._lock:
+            self._counts['staleServed'] += 1
+        self._touch(key)
+        return json.loads(data)
+
+    def _touch(self, key: Hashable):
+        """Mark an entry used; skipped if it already was within the last second, to spare hot keys a write per hit"""
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(update(cache_entries)
+                         .where(cache_entries.c.key == _cache_key(key), cache_entries.c.last_used < now - 1)
+                         .values(last_used=now))
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        stmt = sqlite_insert(cache_entries).values(
+            key=_cache_key(key), expires_at=now + (self.ttl if ttl is None else ttl),
+            last_used=now, data=json.dumps(value)
+        )
+        stmt = stmt.on_conflict_do_update(index_elements=[cache_entries.c.key], set_={
+            'expires_at': stmt.excluded.expires_at,
+            'last_used': stmt.excluded.last_used,
+            'data': stmt.excluded.data
+        })
+        oldest = (select(cache_entries.c.key).order_by(cache_entries.c.last_used.desc())
+                  .offset(self.max_entries).scalar_subquery())
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+            evicted = conn.execute(delete(cache_entries).where(cache_entries.c.key.in_(oldest))).rowcount
+        if evicted:
+            with self._lock:
+                self._counts['evictions'] += evicted
+
+    def record_bypass(self):
+        with self._lock:
+            self._counts['bypasses'] += 1
+
+    def clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(delete(cache_entries))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.engine.connect() as conn:
+            entries = conn.execute(select(func.count()).select_from(cache_entries)).scalar()
+        with self._lock:
+            lookups = self._counts['hits'] + self._counts['misses']
+            return {
+                'entries': entries,
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                'shared': True,
+                **self._counts,
+                'hitRatio': self._counts['hits'] / lookups if lookups else 0.0
+            }
+
+
+JOB_STAGES = {'queued': 0, 'running': 1, 'completed': 2, 'failed': 2}
+
+
+class SqliteJobRecords:
+    """Job status kept in the store's database, so a job can be polled on any worker process"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def put(self, job: Dict[str, Any]):
+        """Record a job's latest status; a write that arrives after a later stage's is ignored"""
+        stmt = sqlite_insert(job_records).values(
+            id=job['id'], stage=JOB_STAGES[job['status']], finished_at=job['finishedAt'], data=json.dumps(job)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[job_records.c.id],
+            set_={
+                'stage': stmt.excluded.stage,
+                'finished_at': stmt.excluded.finished_at,
+                'data': stmt.excluded.data
+            },
+            where=job_records.c.stage <= stmt.excluded.stage
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def discard(self, job_id: str):
+        with self.engine.begin() as conn:
+            conn.execute(delete(job_records).where(job_records.c.id == job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            data = conn.execute(select(job_records.c.data).where(job_records.c.id == job_id)).scalar()
+        return json.loads(data) if data is not None else None
+
+    def prune(self, cutoff: float) -> int:
+        """Forget jobs that finished before cutoff"""
+        with self.engine.begin() as conn:
+            return conn.execute(delete(job_records).where(job_records.c.finished_at < cutoff)).rowcount
+
+
+def _cache_key(key: Hashable) -> str:
+    if isinstance(key, tuple):
+        return '|'.join(str(part) for part in key)
+    return str(key)
+
+
+def _row(collection: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = record.get('metadata') or {}
+    return {
+        'id': record['id'],
+        'collection': collection,
+        'user_id': record['userId'],
+        'content_type': metadata.get('content_type'),
+        'subject': metadata.get('subject'),
+        'created_at': record['createdAt'],
+        'data': record_json(record)
+    }
+
+
+def _add_deltas(deltas: Counter, collection: str, record: Dict[str, Any], delta: int):
+    for dimension, key in stat_keys(collection, record):
+        deltas[(record['userId'], dimension, key)] += delta
+
+
+def _recount(conn) -> Counter:
+    """Counters recomputed from the records table, keyed (user_id, dimension, key)"""
+    counts = Counter()
+    for dimension, column in (('collections', records.c.collection),
+                              ('subjects', records.c.subject),
+                              ('contentTypes', records.c.content_type)):
+        query = (select(records.c.user_id, column, func.count())
+                 .where(column.isnot(None))
+                 .group_by(records.c.user_id, column))
+        for user_id, key, count in conn.execute(query):
+            counts[(user_id, dimension, key)] = count
+    return counts
@@ -0,0 +1,154 @@
+import io
+import os
+import re
+import gzip
+import hashlib
+import logging
+import mimetypes
+import tempfile
+from typing import Dict, Optional
+
+from flask import Request, Response, send_file
+
+logger = logging.getLogger(__name__)
+
+# Vite puts content-hashed bundles under assets/, e.g. assets/index-DMNroI5Z.js
+FINGERPRINTED = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Everything else (index.html above all) is revalidated, so a new build is picked up at once
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                'image/svg+xml', 'image/vnd.microsoft.icon', 'application/wasm')
+# Below this, compression saves less than the headers it adds
+MIN_COMPRESS_BYTES = 1024
+# Preferred first when the client accepts both
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class Asset:
+    __slots__ = ('path', 'mimetype', 'size', 'mtime', 'etag', 'cache_control', 'variants')
+
+    def __init__(self, path: str, mimetype: str, size: int, mtime: float, etag: str, cache_control: str):
+        self.path = path
+        self.mimetype = mimetype
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.cache_control = cache_control
+        # encoding -> path of the precompressed file, or its bytes when it could not be written
+        self.variants: Dict[str, object] = {}
+
+
+class StaticAssets:
+    """The built frontend, indexed once and served with compression and caching.
+
+    The static folder is walked at startup: each file gets a content-hash
+    ETag and a gzip (and, with the brotli package installed, brotli) variant
+    when it is compressible. Variants already next to the file (app.js.gz,
+    app.js.br, as written by a build step or a previous start) are reused
+    if newer than the file; missing ones are compressed once and saved
+    there, or kept in memory if the folder is read-only. Requests are then
+    a dict lookup: no filesystem checks, the smallest variant the client
+    accepts, long-lived immutable caching for fingerprinted bundles and 304s
+    for conditional requests.
+    """
+
+    def __init__(self, directory: str, compress: bool = True):
+        self.directory = directory
+        self.compress = compress
+        self.assets: Dict[str, Asset] = {}
+        self.index()
+
+    def index(self):
+        assets = {}
+        brotli = _brotli() if self.compress else None
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(tuple(ENCODINGS.values())):
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                assets[relative] = self._load(relative, path, brotli)
+        self.assets = assets
+        logger.info(f"Indexed {len(assets)} static file(s) in {self.directory}")
+
+    def _load(self, relative: str, path: str, brotli) -> Asset:
+        with open(path, 'rb') as f:
+            data = f.read()
+        stat = os.stat(path)
+        mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+        asset = Asset(
+            path, mimetype, len(data), stat.st_mtime,
+            hashlib.blake2b(data, digest_size=12).hexdigest(),
+            IMMUTABLE if FINGERPRINTED.match(relative) else REVALIDATE
+        )
+        if not self.compress or len(data) < MIN_COMPRESS_BYTES or not mimetype.startswith(COMPRESSIBLE):
+            return asset
+
+        compressors = {'gzip': lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressors['br'] = lambda raw: brotli.compress(raw, quality=11)
+        for encoding, suffix in ENCODINGS.items():
+            variant = path + suffix
+            if os.path.exists(variant) and os.stat(variant).st_mtime >= stat.st_mtime:
+                asset.variants[encoding] = variant
+            elif encoding in compressors:
+                compressed = compressors[encoding](data)
+                if len(compressed) < len(data):
+                    asset.variants[encoding] = self._save(variant, compressed)
+        return asset
+
+    @staticmethod
+    def _save(path: str, data: bytes):
+        """Write a variant next to its file (atomically, as workers may race); its bytes if that fails"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            return path
+        except OSError as e:
+            logger.warning(f"Keeping {path} in memory: {str(e)}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return data
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path)
+
+    def response(self, asset: Asset, request: Request) -> Response:
+        encoding = self._negotiate(asset, request)
+        if encoding is None:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag,
+                                 last_modified=asset.mtime, conditional=True)
+        else:
+            variant = asset.variants[encoding]
+            response = send_file(variant if isinstance(variant, str) else io.BytesIO(variant),
+                                 mimetype=asset.mimetype, etag=f"{asset.etag}-{encoding}",
+                                 last_modified=asset.mtime, conditional=True)
+            if response.status_code != 304:
+                response.headers['Content-Encoding'] = encoding
+        # send_file names the file it sent, which for a variant is app.js.gz
+        del response.headers['Content-Disposition']
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = asset.cache_control
+        return response
+
+    @staticmethod
+    def _negotiate(asset: Asset, request: Request) -> Optional[str]:
+        accepted = request.accept_encodings
+        for encoding in ENCODINGS:
+            if encoding in asset.variants and accepted[encoding] > 0:
+                return encoding
+        return None
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import inspect
+import logging
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_TRACE_ID = re.compile(r'^[0-9a-f]{16,32}$')
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$')
+
+# (trace, depth of the innermost open span) for the request on this thread
+_current: ContextVar[Optional[Tuple['Trace', int]]] = ContextVar('sahayak_trace', default=None)
+
+
+class Trace:
+    """Spans recorded while handling one request.
+
+    Each span is (name, start offset, duration, depth) in seconds relative
+    to the start of the trace; depth 1 spans are called directly from the
+    handler. Spans are appended from whichever thread finishes them.
+    """
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.id = trace_id or os.urandom(16).hex()
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float, int]] = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {'name': name, 'startMs': round(start * 1000, 3), 'durationMs': round(duration * 1000, 3), 'depth': depth}
+            for name, start, duration, depth in sorted(self.spans, key=lambda span: span[1])
+        ]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: total time per top-level span name, plus the whole request"""
+        totals: Dict[str, float] = {}
+        for name, _, duration, depth in self.spans:
+            if depth == 1:
+                totals[name] = totals.get(name, 0.0) + duration
+        parts = [f'{name};dur={duration * 1000:.1f}' for name, duration in totals.items()]
+        parts.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def trace_id_from_headers(headers) -> Optional[str]:
+    """Trace id propagated by the caller (X-Trace-Id or W3C traceparent), if valid"""
+    candidate = (headers.get('X-Trace-Id') or '').lower()
+    if _TRACE_ID.match(candidate):
+        return candidate
+    match = _TRACEPARENT.match((headers.get('traceparent') or '').lower())
+    return match.group(1) if match else None
+
+
+def start_trace(trace_id: Optional[str] = None) -> Trace:
+    """Begin tracing the current request; spans opened on this thread are recorded on it"""
+    trace = Trace(trace_id)
+    _current.set((trace, 0))
+    return trace
+
+
+def end_trace():
+    _current.set(None)
+
+
+def current_trace() -> Optional[Trace]:
+    state = _current.get()
+    return state[0] if state is not None else None
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as a span of the current trace (a no-op outside a trace)"""
+    state = _current.get()
+    if state is None:
+        yield
+        return
+    trace, depth = state
+    token = _current.set((trace, depth + 1))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, started - trace.started, time.perf_counter() - started, depth + 1))
+        _current.reset(token)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator recording each call as a span.
+
+    Generators (sync or async) are timed from creation until exhausted or
+    closed; they may be resumed from another context, so their span does
+    not nest others. Coroutine functions are timed until they return.
+    """
+    def decorator(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def async_stream_wrapper(*args, **kwargs):
+                state = _current.get()
+                started = time.perf_counter()
+                stream = fn(*args, **kwargs)
+                try:
+                    async for item in stream:
+                        yield item
+                finally:
+                    await stream.aclose()
+                    if state is not None:
+                        trace, depth = state
+                        trace.spans.append((name, started - trace.started, time.perf_counter() - started, depth + 1))
+            return async_stream_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def stream_wrapper(*args, **kwargs):
+                state = _current.get()
+                if state is None:
+                    return (yield from fn(*args, **kwargs))
+                trace, depth = state
+                started = time.perf_counter()
+                try:
+                    return (yield from fn(*args, **kwargs))
+                finally:
+                    trace.spans.append((name, started - trace.started, time.perf_counter() - started, depth + 1))
+            return stream_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument(obj: Any, prefix: str, methods: Iterable[str]):
+    """Record the named methods of one object as spans called '<prefix>.<method>'"""
+    for method in methods:
+        setattr(obj, method, traced(f'{prefix}.{method}')(getattr(obj, method)))
+    return obj
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds the current trace id (or '-') to log records as ``trace_id``"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = current_trace()
+        record.trace_id = trace.id if trace is not None else '-'
+        return True
@@ -0,0 +1,135 @@
+"""Local stand-in for a model server, for running the HTTP backend offline.
+
+Speaks the protocol HTTPBackend expects: POST /v1/generate with a JSON body
+{"prompt", "max_tokens", "response_format", "stream"} returns {"text": ...},
+or newline-delimited {"text": chunk} objects when "stream" is true.
+Connections are kept alive (HTTP/1.1) so client-side pooling can be measured.
+A fraction of requests can be made very slow (--tail-ratio) or fail with a
+503 (--error-rate) to exercise hedging and the circuit breaker.
+
+Usage (from the backend directory):
+    python tools/fake_model_server.py --port 8088 --latency 0.5
+    SAHAYAK_LLM_BACKEND=http python src/main.py
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNKS = 8
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; Nagle would hold the body
+    # back for a delayed ACK on every reused connection
+    disable_nagle_algorithm = True
+    # Set from the command line (or by whoever builds the server)
+    latency = 0.5
+    jitter = 0.0
+    tail_ratio = 0.0
+    tail_latency = 5.0
+    error_rate = 0.0
+
+    def do_POST(self):
+        if self.path != '/v1/generate':
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            self._reply(400, {'error': 'invalid JSON'})
+            return
+
+        if random.random() < self.error_rate:
+            self._reply(503, {'error': 'injected failure'})
+            return
+
+        text = self._complete(body)
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        if random.random() < self.tail_ratio:
+            delay = self.tail_latency
+
+        if not body.get('stream'):
+            time.sleep(delay)
+            self._reply(200, {'text': text})
+            return
+
+        # Chunked transfer so the connection stays reusable after the stream
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        step = max(1, len(text) // CHUNKS + 1)
+        for start in range(0, len(text), step):
+            time.sleep(delay / CHUNKS)
+            line = json.dumps({'text': text[start:start + step]}).encode('utf-8') + b'\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _complete(self, body):
+        prompt = body.get('prompt', '')
+        if body.get('response_format') == 'json':
+            return json.dumps({
+                'description': 'Stand-in analysis from the local fake model server',
+                'prompt_chars': len(prompt)
+            })
+        words = max(1, min(int(body.get('max_tokens', 256)), 400))
+        first_line = prompt.strip().splitlines()[0] if prompt.strip() else ''
+        return f"# Response\n\n{first_line}\n\n" + ' '.join(['lorem'] * words) + '\n'
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Request logging would dominate the cost of a fast fake
+        pass
+
+
+def start_server(host='127.0.0.1', port=0, **behaviour):
+    """Serve on a background thread; returns the server (port 0 picks a free one).
+
+    Keyword arguments override the handler's latency, jitter, tail_ratio,
+    tail_latency and error_rate.
+    """
+    handler = type('Handler', (FakeModelHandler,), behaviour)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per generation')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of random latency')
+    parser.add_argument('--tail-ratio', type=float, default=0.0, help='fraction of requests that are slow')
+    parser.add_argument('--tail-latency', type=float, default=5.0, help='seconds taken by slow requests')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    FakeModelHandler.latency = args.latency
+    FakeModelHandler.jitter = args.jitter
+    FakeModelHandler.tail_ratio = args.tail_ratio
+    FakeModelHandler.tail_latency = args.tail_latency
+    FakeModelHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), FakeModelHandler)
+    server.daemon_threads = True
+    print(f"Fake model server on http://{args.host}:{server.server_port}/v1/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -57,35 +57,42 @@ const ImageAnalyzerPage = () => {
 
     setIsAnalyzing(true);
     try {
-      // Convert image to base64
-      const reader = new FileReader();
-      reader.onload = async () => {
-        const base64Image = reader.result.split(',')[1];
-        
-        const response = await fetch('/api/analyze-image', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            subject: formData.subject || 'General',
-            grade: formData.grade || 'Grade 5',
-            language: formData.language,
-            imageData: base64Image,
-            userId: 'demo-user'
-          }),
-        });
-
-        const data = await response.json();
-        
-        if (data.success) {
-          setAnalysis(data.analysis);
-          toast.success('Image analysis completed!');
-        } else {
-          toast.error('Failed to analyze image');
-        }
-      };
-      reader.readAsDataURL(uploadedImage);
+      // Stream the image to the upload endpoint instead of inlining it as base64
+      const uploadData = new FormData();
+      uploadData.append('file', uploadedImage, uploadedImage.name);
+      const uploadResponse = await fetch('/api/uploads', {
+        method: 'POST',
+        body: uploadData,
+      });
+      const upload = await uploadResponse.json();
+
+      if (!upload.success) {
+        toast.error('Failed to upload image');
+        return;
+      }
+
+      const response = await fetch('/api/analyze-image', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          subject: formData.subject || 'General',
+          grade: formData.grade || 'Grade 5',
+          language: formData.language,
+          imageUploadId: upload.uploadId,
+          userId: 'demo-user'
+        }),
+      });
+
+      const data = await response.json();
+      
+      if (data.success) {
+        setAnalysis(data.analysis);
+        toast.success('Image analysis completed!');
+      } else {
+        toast.error('Failed to analyze image');
+      }
     } catch (error) {
       console.error('Error analyzing image:', error);
       toast.error('Error analyzing image');
@@ -121,33 +121,40 @@ const VideoCreatorPage = () => {
 
     setIsProcessing(true);
     try {
-      // Convert blob to base64 for API
-      const reader = new FileReader();
-      reader.onloadend = async () => {
-        const base64Video = reader.result.split(',')[1];
-        
-        const response = await fetch('/api/process-video', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            language: selectedLanguage.name,
-            videoData: base64Video,
-            userId: 'demo-user'
-          }),
-        });
-
-        const data = await response.json();
-        
-        if (data.success) {
-          setProcessedContent(data.processedContent);
-          toast.success('Video processed successfully!');
-        } else {
-          toast.error('Failed to process video');
-        }
-      };
-      reader.readAsDataURL(recordedVideo);
+      // Stream the recording to the upload endpoint instead of inlining it as base64
+      const formData = new FormData();
+      formData.append('file', recordedVideo, 'recording.webm');
+      const uploadResponse = await fetch('/api/uploads', {
+        method: 'POST',
+        body: formData,
+      });
+      const upload = await uploadResponse.json();
+
+      if (!upload.success) {
+        toast.error('Failed to upload video');
+        return;
+      }
+
+      const response = await fetch('/api/process-video', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          language: selectedLanguage.name,
+          videoUploadId: upload.uploadId,
+          userId: 'demo-user'
+        }),
+      });
+
+      const data = await response.json();
+      
+      if (data.success) {
+        setProcessedContent(data.processedContent);
+        toast.success('Video processed successfully!');
+      } else {
+        toast.error('Failed to process video');
+      }
     } catch (error) {
       console.error('Error processing video:', error);
       toast.error('Error processing video');
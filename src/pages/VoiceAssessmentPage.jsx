@@ -124,36 +124,43 @@ const VoiceAssessmentPage = () => {
 
     setIsAnalyzing(true);
     try {
-      // Convert blob to base64 for API
-      const reader = new FileReader();
-      reader.onloadend = async () => {
-        const base64Audio = reader.result.split(',')[1];
-        
-        const response = await fetch('/api/process-voice-assessment', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            subject: formData.subject,
-            grade: formData.grade,
-            language: formData.language,
-            question: formData.question,
-            audioData: base64Audio,
-            userId: 'demo-user'
-          }),
-        });
-
-        const data = await response.json();
-        
-        if (data.success) {
-          setAnalysis(data.analysis);
-          toast.success('Voice assessment completed!');
-        } else {
-          toast.error('Failed to analyze recording');
-        }
-      };
-      reader.readAsDataURL(audioBlob);
+      // Stream the recording to the upload endpoint instead of inlining it as base64
+      const uploadData = new FormData();
+      uploadData.append('file', audioBlob, 'recording.wav');
+      const uploadResponse = await fetch('/api/uploads', {
+        method: 'POST',
+        body: uploadData,
+      });
+      const upload = await uploadResponse.json();
+
+      if (!upload.success) {
+        toast.error('Failed to upload recording');
+        return;
+      }
+
+      const response = await fetch('/api/process-voice-assessment', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          subject: formData.subject,
+          grade: formData.grade,
+          language: formData.language,
+          question: formData.question,
+          audioUploadId: upload.uploadId,
+          userId: 'demo-user'
+        }),
+      });
+
+      const data = await response.json();
+      
+      if (data.success) {
+        setAnalysis(data.analysis);
+        toast.success('Voice assessment completed!');
+      } else {
+        toast.error('Failed to analyze recording');
+      }
     } catch (error) {
       console.error('Error analyzing recording:', error);
       toast.error('Error analyzing recording');